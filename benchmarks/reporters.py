@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measures what each output format costs per test event.
+
+Synthetic suites of trivial tests (with a mix of passes, failures, skips
+and errors) are run through every format TestRunner has, writing to a
+terminal (a pseudo-terminal where there is one), a pipe and a file. Each
+run happens in a fresh process, so peak memory is that run's alone.
+
+For every run it reports events per second (start, outcome and stop of
+each test), the time spent inside the reporter's hooks against everything
+else (the tests and unittest itself), peak memory, and how much the peak
+grew during the run itself, once the suite had been built.
+
+    python benchmarks/reporters.py
+    python benchmarks/reporters.py --sizes 1000,10000 --formats dots,spec --streams file
+    python benchmarks/reporters.py --save before.json
+    python benchmarks/reporters.py --compare before.json
+
+With --compare, runs that have gotten slower than the saved ones by more
+than --tolerance, or whose memory grew by that much more, are listed and
+the exit status is 1.
+"""
+
+import sys, os
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+import argparse
+
+try:
+    import resource
+except ImportError:
+    resource = None #windows
+try:
+    import pty
+except ImportError:
+    pty = None
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..'))
+from unitstyle import unitstyle
+
+
+FORMATS = ['list','dots','jsstream','json','json-incremental','junit','progress','min','tap','spec']
+STREAMS = ['tty','pipe','file']
+SIZES = [1000,10000,100000]
+#percent of tests that pass, fail, skip and error
+MIX = (90,5,3,2)
+#tests per generated TestCase class
+CLASS_SIZE = 100
+#peak memory is only measured in pages, and moves around a little from run
+#to run. Memory growth that differs by less than this isn't a regression
+MEMORY_SLACK = 1048576
+
+timer = unitstyle.timer
+
+
+def makeSuite(size,mix=MIX):
+    """ a suite of size trivial tests, with outcomes in the given mix """
+    def passes(self):
+        pass
+    def fails(self):
+        self.fail("synthetic failure")
+    def skips(self):
+        self.skipTest("synthetic skip")
+    def errors(self):
+        raise ValueError("synthetic error")
+
+    kinds = []
+    for kind, percent in zip((passes,fails,skips,errors),mix):
+        kinds.extend([kind]*percent)
+    #spread the outcomes out the same way every time
+    random.Random(0).shuffle(kinds)
+
+    suite = unittest.TestSuite()
+    for start in range(0,size,CLASS_SIZE):
+        methods = {'__module__': 'synthetic'}
+        for n in range(start,min(start+CLASS_SIZE,size)):
+            methods['test_%06d' % n] = kinds[n % len(kinds)]
+        cls = type('Case%06d' % start,(unittest.TestCase,),methods)
+        suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(cls))
+    return suite
+
+
+def timedResult(cls,timing):
+    """ a subclass of cls that adds the time spent in its hooks to timing[0] """
+    hooks = ('startTestRun','stopTestRun','startTest','stopTest','addSuccess',
+             'addFailure','addError','addSkip','addSubTest','addExpectedFailure',
+             'addUnexpectedSuccess','flush')
+    depth = [0]
+
+    def wrap(name):
+        method = getattr(cls,name)
+        def timed(self,*args):
+            #hooks calling other hooks are only counted once
+            depth[0] += 1
+            start = timer()
+            try:
+                return method(self,*args)
+            finally:
+                depth[0] -= 1
+                if not depth[0]:
+                    timing[0] += timer() - start
+        return timed
+
+    return type(cls.__name__,(cls,),dict((name,wrap(name)) for name in hooks))
+
+
+class TimedRunner(unitstyle.TestRunner):
+    def __init__(self,timing,**kwargs):
+        super(TimedRunner,self).__init__(**kwargs)
+        self.timing = timing
+
+    def resultClass(self,fmt):
+        return timedResult(super(TimedRunner,self).resultClass(fmt),self.timing)
+
+
+class Drain(threading.Thread):
+    """ reads everything written to fd, so writers never block """
+    def __init__(self,fd):
+        super(Drain,self).__init__()
+        self.daemon = True
+        self.fd = fd
+
+    def run(self):
+        try:
+            while os.read(self.fd,65536):
+                pass
+        except OSError:
+            pass #a pty's reading end errors out instead of EOF
+
+
+class FakeTTY(object):
+    """ stands in for a terminal where there's no pty module """
+    def write(self,text):
+        pass
+    def flush(self):
+        pass
+    def isatty(self):
+        return True
+    def close(self):
+        pass
+
+
+def openStream(kind):
+    """ an output stream of the given kind, and a function to clean it up """
+    if kind == 'file':
+        stream = tempfile.TemporaryFile('w+')
+        return stream, stream.close
+    if kind == 'tty' and pty is None:
+        stream = FakeTTY()
+        return stream, stream.close
+    if kind == 'tty':
+        reader, writer = pty.openpty()
+    else:
+        reader, writer = os.pipe()
+    stream = os.fdopen(writer,'w')
+    drain = Drain(reader)
+    drain.start()
+    def close():
+        stream.close()
+        drain.join(5)
+        os.close(reader)
+    return stream, close
+
+
+def peakMemory():
+    """ peak resident memory of this process so far, in bytes """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak*1024
+
+
+def runOne(size,fmt,kind,mix):
+    """ one run, in this process. Returns its measurements """
+    suite = makeSuite(size,mix)
+    stream, close = openStream(kind)
+    timing = [0.0]
+    runner = TimedRunner(timing,stream=stream,format=fmt)
+    before = peakMemory()
+    start = timer()
+    try:
+        result = runner.run(suite)
+    finally:
+        total = timer() - start
+        close()
+    events = 3*result.testsRun
+    return {
+        'size': size,
+        'format': fmt,
+        'stream': kind,
+        'events_per_second': events/total,
+        'total': total,
+        'reporter': timing[0],
+        'other': total - timing[0],
+        'peak_memory': peakMemory(),
+        'memory_growth': peakMemory() - before,
+    }
+
+
+def runIsolated(size,fmt,kind,mix):
+    """ runOne in a fresh process """
+    out = subprocess.check_output([
+        sys.executable,os.path.abspath(__file__),'--one',
+        json.dumps({'size': size, 'format': fmt, 'stream': kind, 'mix': mix})
+    ])
+    return json.loads(out.decode('utf-8'))
+
+
+def report(results):
+    header = '%8s %-17s %-5s %12s %9s %9s %9s %7s %10s %10s' % (
+        'tests','format','to','events/s','total','reporter','other','rep %','peak MB','growth MB')
+    print(header)
+    print('-'*len(header))
+    for r in results:
+        print('%8d %-17s %-5s %12.0f %8.3fs %8.3fs %8.3fs %6.1f%% %10.1f %10.1f' % (
+            r['size'],r['format'],r['stream'],r['events_per_second'],
+            r['total'],r['reporter'],r['other'],
+            100.0*r['reporter']/r['total'] if r['total'] else 0,
+            r['peak_memory']/1048576.0,
+            r['memory_growth']/1048576.0,
+        ))
+
+
+def compare(results,saved,tolerance):
+    """ runs that got slower than in saved by more than tolerance, and
+        runs whose memory grew by that much more (and MEMORY_SLACK)
+    """
+    before = dict(((r['size'],r['format'],r['stream']),r) for r in saved)
+    slower, bigger = [], []
+    for r in results:
+        old = before.get((r['size'],r['format'],r['stream']))
+        if not old:
+            continue
+        if r['events_per_second'] < old['events_per_second']*(1-tolerance):
+            slower.append((r,old))
+        if 'memory_growth' in old and r['memory_growth'] > max(
+                old['memory_growth']*(1+tolerance),old['memory_growth']+MEMORY_SLACK):
+            bigger.append((r,old))
+    return slower, bigger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the overhead of unitstyle's reporters")
+    parser.add_argument('--sizes',default=','.join(map(str,SIZES)),
+                        help='comma separated suite sizes')
+    parser.add_argument('--formats',default=','.join(FORMATS),
+                        help='comma separated formats')
+    parser.add_argument('--streams',default=','.join(STREAMS),
+                        help='comma separated: tty, pipe and/or file')
+    parser.add_argument('--mix',default=','.join(map(str,MIX)),
+                        help='percent of tests that pass,fail,skip,error')
+    parser.add_argument('--save',help='write the results to this JSON file')
+    parser.add_argument('--compare',help='JSON file saved by an earlier --save')
+    parser.add_argument('--tolerance',type=float,default=0.2,
+                        help='fraction of events/s a run may lose, or of memory growth it may '
+                             'gain, before --compare complains')
+    parser.add_argument('--one',help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.one:
+        one = json.loads(args.one)
+        print(json.dumps(runOne(one['size'],one['format'],one['stream'],one['mix'])))
+        return 0
+
+    mix = [int(n) for n in args.mix.split(',')]
+    if len(mix) != 4 or sum(mix) != 100:
+        parser.error('--mix needs four percentages adding up to 100')
+
+    results = []
+    for size in [int(n) for n in args.sizes.split(',')]:
+        for fmt in args.formats.split(','):
+            for kind in args.streams.split(','):
+                sys.stderr.write('%d tests, %s to %s...\n' % (size,fmt,kind))
+                results.append(runIsolated(size,fmt,kind,mix))
+    report(results)
+
+    if args.save:
+        with open(args.save,'w') as f:
+            json.dump(results,f,indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            slower, bigger = compare(results,json.load(f),args.tolerance)
+        for r, old in slower:
+            print('slower: %d tests, %s to %s: %.0f events/s, was %.0f' % (
+                r['size'],r['format'],r['stream'],
+                r['events_per_second'],old['events_per_second']))
+        for r, old in bigger:
+            print('more memory: %d tests, %s to %s: grew %.1fMB, was %.1fMB' % (
+                r['size'],r['format'],r['stream'],
+                r['memory_growth']/1048576.0,old['memory_growth']/1048576.0))
+        if slower or bigger:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
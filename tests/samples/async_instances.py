@@ -0,0 +1,31 @@
+""" async tests checking that the tests before them have been let go of """
+import asyncio
+import gc
+import unittest
+import weakref
+
+instances = []
+
+
+async def nothing():
+    pass
+
+
+class Async(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        instances.append(weakref.ref(self))
+
+    async def test_0(self):
+        await asyncio.sleep(0)
+
+    async def test_1(self):
+        await asyncio.sleep(0)
+
+    async def test_2(self):
+        #the others finish while this waits
+        for _ in range(500):
+            gc.collect()
+            if not [ref for ref in instances if ref() is not None and ref() is not self]:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("the tests before this one are still held")
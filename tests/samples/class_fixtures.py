@@ -0,0 +1,25 @@
+""" a class whose setUpClass errors while a flag file exists, next to one
+    that's fine
+"""
+import os
+import unittest
+
+flag = os.path.join(os.path.dirname(__file__),'class_fixtures.flag')
+
+
+class Broken(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if os.path.exists(flag):
+            raise RuntimeError("setUpClass failed")
+
+    def test_one(self):
+        pass
+
+    def test_two(self):
+        pass
+
+
+class Fine(unittest.TestCase):
+    def test_fine(self):
+        pass
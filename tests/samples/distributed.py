@@ -0,0 +1,29 @@
+""" a slow class whose tearDownClass fails, for workers to try to share,
+    and classes that can be shared
+"""
+import time
+import unittest
+
+
+class Fixtured(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        raise RuntimeError("tearDownClass failed")
+
+for n in range(8):
+    setattr(Fixtured,'test_%d' % n,lambda self: time.sleep(0.05))
+
+
+class Plain(unittest.TestCase):
+    pass
+
+for n in range(16):
+    setattr(Plain,'test_%d' % n,lambda self: time.sleep(0.05))
+
+
+class Quick(unittest.TestCase):
+    def test_quick(self):
+        pass
+
+    def test_fail(self):
+        self.fail("quick")
@@ -0,0 +1,13 @@
+""" a test that hangs, and one that fails, for a run to stop at """
+import time
+import unittest
+
+
+class Hangs(unittest.TestCase):
+    def test_hang(self):
+        time.sleep(60)
+
+
+class Fails(unittest.TestCase):
+    def test_fail(self):
+        self.fail("stop here")
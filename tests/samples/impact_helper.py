@@ -0,0 +1,5 @@
+""" code only some of the impacted tests run """
+
+
+def double(x):
+    return x*2
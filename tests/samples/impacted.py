@@ -0,0 +1,14 @@
+""" tests where only one runs impact_helper, so only it is affected when
+    impact_helper changes
+"""
+import unittest
+
+from tests.samples import impact_helper
+
+
+class Impacted(unittest.TestCase):
+    def test_uses_helper(self):
+        self.assertEqual(impact_helper.double(2),4)
+
+    def test_alone(self):
+        self.assertEqual(2*2,4)
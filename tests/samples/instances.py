@@ -0,0 +1,32 @@
+""" tests checking that the tests before them have been let go of """
+import gc
+import time
+import unittest
+import weakref
+
+instances = []
+
+
+def released(test):
+    """ wait a little for the tests before test to be let go of """
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        gc.collect()
+        if not [ref for ref in instances if ref() is not None and ref() is not test]:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class Sync(unittest.TestCase):
+    def setUp(self):
+        instances.append(weakref.ref(self))
+
+    def test_0(self):
+        pass
+
+    def test_1(self):
+        pass
+
+    def test_2(self):
+        self.assertTrue(released(self))
@@ -0,0 +1,20 @@
+""" tests that hold on to 2MB, in setUp or for good """
+import unittest
+
+kept = []
+
+
+class Held(unittest.TestCase):
+    def setUp(self):
+        self.data = bytearray(2*1024*1024)
+
+    def test_pass(self):
+        pass
+
+    def test_fail(self):
+        self.fail("held")
+
+
+class Leaked(unittest.TestCase):
+    def test_leak(self):
+        kept.append(bytearray(2*1024*1024))
@@ -0,0 +1,30 @@
+""" classes sharing module fixtures, the last of which fails """
+import unittest
+
+
+def setUpModule():
+    pass
+
+def tearDownModule():
+    raise RuntimeError("tearDownModule failed")
+
+
+class First(unittest.TestCase):
+    def test_pass(self):
+        pass
+
+    def test_fail(self):
+        self.fail("first")
+
+
+class Second(unittest.TestCase):
+    def test_pass(self):
+        pass
+
+    def test_error(self):
+        raise ValueError("second")
+
+
+class Third(unittest.TestCase):
+    def test_pass(self):
+        pass
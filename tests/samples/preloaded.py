@@ -0,0 +1,15 @@
+""" tests checking that they were imported by the fork server their worker
+    was started from, rather than by their worker or the process running them
+"""
+import os
+import unittest
+
+imported_in = os.getpid()
+
+
+class Preloaded(unittest.TestCase):
+    def test_imported_by_parent(self):
+        self.assertEqual(imported_in,os.getppid())
+
+    def test_again(self):
+        self.assertEqual(imported_in,os.getppid())
@@ -0,0 +1,22 @@
+""" a slow test and a fast one, to profile """
+import time
+import unittest
+
+
+def wait():
+    time.sleep(0.2)
+
+def spin():
+    return sum(range(1000))
+
+def spin_more():
+    return [spin() for i in range(10)]
+
+
+class Profiled(unittest.TestCase):
+    def test_slow(self):
+        spin_more()
+        wait()
+
+    def test_fast(self):
+        spin()
@@ -0,0 +1,16 @@
+""" a test with one failing and one erroring subtest """
+import unittest
+
+
+class Params(unittest.TestCase):
+    def test_even(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                self.assertEqual(i % 2,0)
+
+    def test_broken(self):
+        with self.subTest(part='broken'):
+            raise ValueError("broken")
+
+    def test_pass(self):
+        pass
@@ -0,0 +1,41 @@
+import time
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+import unitstyle.unitstyle
+
+
+def run(names,**options):
+    suite = unittest.defaultTestLoader.loadTestsFromNames(names)
+    return unitstyle.TestRunner(stream=StringIO(),format='json',**options).run(suite)
+
+
+@unittest.skipUnless(hasattr(unittest,'IsolatedAsyncioTestCase') and
+                     hasattr(unittest.IsolatedAsyncioTestCase,'_setupAsyncioRunner'),
+                     "async tests only share a loop from python 3.11")
+class ConcurrencyTest(unittest.TestCase):
+    def tearDown(self):
+        #async syntax, so only imported where it's understood
+        from tests.samples import async_instances
+        del async_instances.instances[:]
+
+    def test_tests_let_go(self):
+        result = run(['tests.samples.async_instances'],concurrency=3)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_no_profile(self):
+        self.assertRaises(ValueError,run,['tests.samples.async_instances'],concurrency=3,profile=True)
+
+    def test_timeout_before_start(self):
+        from tests.samples.async_instances import nothing
+        loop = unitstyle.unitstyle.SharedLoop(timeout=0.05)
+        try:
+            #keep the loop busy so the coroutine's task isn't made in time
+            loop.loop.call_soon_threadsafe(time.sleep,0.3)
+            self.assertRaises(TimeoutError,loop.run,nothing())
+        finally:
+            loop.close()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+
+
+TEST_FILE = '''import unittest
+
+
+class Found(unittest.TestCase):
+%s
+'''
+
+
+class DiscoveryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.dir,'cache')
+        self.package = os.path.join(self.dir,'discovered')
+        os.mkdir(self.package)
+        open(os.path.join(self.package,'__init__.py'),'w').close()
+        self.path = os.path.join(self.package,'test_found.py')
+        self.write('test_one')
+
+    def tearDown(self):
+        self.forget()
+        if self.dir in sys.path:
+            sys.path.remove(self.dir)
+        shutil.rmtree(self.dir)
+
+    def write(self,*names):
+        with open(self.path,'w') as f:
+            f.write(TEST_FILE % ''.join('    def %s(self):\n        pass\n' % name for name in names))
+        #make sure the change shows, even within the same second
+        mtime = os.stat(self.path).st_mtime
+        os.utime(self.path,(mtime+10,mtime+10))
+
+    def forget(self):
+        """ drop the imported modules, as a new process would start without them """
+        for name in ('discovered','discovered.test_found'):
+            sys.modules.pop(name,None)
+
+    def discover(self):
+        self.forget()
+        suite = unitstyle.discover(self.package,top_level_dir=self.dir,cache=self.cache)
+        imported = 'discovered.test_found' in sys.modules
+        return suite.countTestCases(), imported
+
+    def test_changed_file_rediscovered(self):
+        self.assertEqual(self.discover(),(1,True))
+        #unchanged, the test comes from the cache without importing
+        self.assertEqual(self.discover(),(1,False))
+        self.write('test_one','test_two')
+        self.assertEqual(self.discover(),(2,True))
+        self.assertEqual(self.discover(),(2,False))
+        #and the cached ids still run
+        result = unitstyle.TestRunner(stream=StringIO(),format='json').run(
+            unitstyle.discover(self.package,top_level_dir=self.dir,cache=self.cache))
+        self.assertEqual(result.testsRun,2)
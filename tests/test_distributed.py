@@ -0,0 +1,34 @@
+import time
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+
+
+def run(names,**options):
+    suite = unittest.defaultTestLoader.loadTestsFromNames(names)
+    result = unitstyle.TestRunner(stream=StringIO(),format='json',**options).run(suite)
+    return result.testsRun, len(result.failures), len(result.errors)
+
+
+class DistributedTest(unittest.TestCase):
+    names = ['tests.samples.distributed','tests.samples.module_fixtures']
+
+    def test_same_as_serial(self):
+        serial = run(self.names)
+        self.assertEqual(serial,(31,2,3))
+        self.assertEqual(run(self.names,listen='127.0.0.1:0',workers=2),serial)
+
+    def test_hung_worker_stopped(self):
+        suite = unittest.defaultTestLoader.loadTestsFromName('tests.samples.hanging')
+        runner = unitstyle.TestRunner(stream=StringIO(),format='json',failfast=True,
+                                      listen='127.0.0.1:0',workers=2)
+        runner.stop_timeout = 1
+        start = time.time()
+        result = runner.run(suite)
+        self.assertEqual(len(result.failures),1)
+        #rather than waiting the minute out for test_hang
+        self.assertLess(time.time()-start,30)
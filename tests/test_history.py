@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+from tests.samples import class_fixtures, impact_helper, impacted
+
+
+class LastFailedTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.history = os.path.join(self.dir,'history')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        if os.path.exists(class_fixtures.flag):
+            os.remove(class_fixtures.flag)
+
+    def run_tests(self,**options):
+        suite = unittest.defaultTestLoader.loadTestsFromModule(class_fixtures)
+        result = unitstyle.TestRunner(stream=StringIO(),format='json',history=self.history,**options).run(suite)
+        return result.testsRun, len(result.errors)
+
+    def test_fixture_errors_rerun(self):
+        open(class_fixtures.flag,'w').close()
+        self.assertEqual(self.run_tests(),(1,1))
+        #the class's tests are what failed, not the class that passed
+        self.assertEqual(self.run_tests(rerun='last-failed'),(0,1))
+        os.remove(class_fixtures.flag)
+        self.assertEqual(self.run_tests(rerun='last-failed'),(2,0))
+        #and once they've run, nothing is failing
+        self.assertEqual(self.run_tests(rerun='last-failed'),(3,0))
+
+
+class ImpactTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.history = os.path.join(self.dir,'history')
+        #files are traced relative to the working directory
+        self.cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def run_tests(self,**options):
+        suite = unittest.defaultTestLoader.loadTestsFromModule(impacted)
+        result = unitstyle.TestRunner(stream=StringIO(),format='json',history=self.history,**options).run(suite)
+        return sorted(test.id().split('.')[-1] for test in result.successes), result.unaffected
+
+    def test_changed_file_selects_dependents(self):
+        self.assertEqual(self.run_tests(impact=True),(['test_alone','test_uses_helper'],0))
+        helper = os.path.relpath(impact_helper.__file__.rstrip('co'))
+        self.assertEqual(self.run_tests(changed=[helper]),(['test_uses_helper'],1))
+        #both ran impacted.py itself
+        self.assertEqual(self.run_tests(changed=[impacted.__file__.rstrip('co')]),(['test_alone','test_uses_helper'],0))
+        self.assertEqual(self.run_tests(changed=['README.md']),([],2))
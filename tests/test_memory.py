@@ -0,0 +1,21 @@
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+import unitstyle.unitstyle
+from tests.samples import memory
+
+
+@unittest.skipIf(unitstyle.unitstyle.tracemalloc is None,"no tracemalloc before python 3.4")
+class MemoryTest(unittest.TestCase):
+    def tearDown(self):
+        del memory.kept[:]
+
+    def test_leaks(self):
+        suite = unittest.defaultTestLoader.loadTestsFromModule(memory)
+        result = unitstyle.TestRunner(stream=StringIO(),format='json',memory=True).run(suite)
+        self.assertEqual([test_id for m, test_id in result.leaks],
+                         ['tests.samples.memory.Leaked.test_leak'])
@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+
+
+class MergeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def shard(self,name,format):
+        path = os.path.join(self.dir,'%s.%s' % (name.rsplit('.',1)[-1],format))
+        suite = unittest.defaultTestLoader.loadTestsFromName(name)
+        with open(path,'w') as stream:
+            unitstyle.TestRunner(stream=stream,format=format).run(suite)
+        return path
+
+    def merge(self,*paths):
+        stream = StringIO()
+        result = unitstyle.TestRunner(stream=stream,format='json').merge(paths)
+        return result, json.loads(stream.getvalue())['stats']
+
+    @unittest.skipUnless(hasattr(unittest.TestCase,'subTest'),"no subtests before python 3.4")
+    def test_subtest_failures(self):
+        for format in ('json','jsstream','json-incremental'):
+            result, stats = self.merge(self.shard('tests.samples.subtests',format))
+            self.assertFalse(result.wasSuccessful(),format)
+            self.assertEqual((stats['tests'],stats['passed'],stats['failures'],stats['errors']),
+                             (3,1,1,1),format)
+
+    def test_shards_summed(self):
+        result, stats = self.merge(self.shard('tests.samples.module_fixtures','json-incremental'),
+                                   self.shard('tests.samples.class_fixtures','jsstream'))
+        self.assertEqual((stats['tests'],stats['passed'],stats['failures'],stats['errors']),
+                         (8,6,1,2))
+
+    def test_stats_disagree(self):
+        path = self.shard('tests.samples.module_fixtures','json-incremental')
+        with open(path) as f:
+            text = f.read()
+        #as if a failure's entry were lost
+        text = text.replace('"failures": 1','"failures": 2').replace('"tests": 5','"tests": 13')
+        with open(path,'w') as f:
+            f.write(text)
+        result, stats = self.merge(path)
+        self.assertEqual(stats['tests'],13)
+        self.assertEqual([str(record) for record, trace in result.errors][-1],'merge (%s)' % path)
+        self.assertIn('failures=1 (the stats say 2)',str(result.errors[-1][1]))
@@ -0,0 +1,90 @@
+import time
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle.unitstyle as unitstyle
+
+
+class BufferedOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.result = unitstyle.Result(self.stream,True,1,0)
+        self.result.flush_interval = 0.05
+
+    def test_held_back(self):
+        self.result.write('.')
+        self.assertEqual(self.stream.getvalue(),'')
+        self.result.flush()
+        self.assertEqual(self.stream.getvalue(),'.')
+
+    def test_flushed_without_more_writes(self):
+        #as if the next test hung
+        self.result.write('.')
+        deadline = time.time() + 5
+        while not self.stream.getvalue() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.stream.getvalue(),'.')
+
+    def test_flushed_when_full(self):
+        self.result.write('.'*self.result.flush_size)
+        self.assertEqual(len(self.stream.getvalue()),self.result.flush_size)
+
+    def test_one_flusher(self):
+        #as if every test failed, which flushes after it
+        self.result.write('.')
+        flusher = self.result.flusher
+        for n in range(100):
+            self.result.flush()
+            self.result.write('.')
+            self.assertIs(self.result.flusher,flusher)
+
+
+class Writes(object):
+    """ a stream remembering each write """
+    def __init__(self):
+        self.writes = []
+
+    def write(self,text):
+        self.writes.append(text)
+
+    def flush(self):
+        pass
+
+
+class RendererTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.timer = unitstyle.timer
+        unitstyle.timer = lambda: self.now
+        self.stream = Writes()
+        self.renderer = unitstyle.Renderer(self.stream,lambda text,color: text,width=40)
+
+    def tearDown(self):
+        unitstyle.timer = self.timer
+
+    def test_frames_throttled(self):
+        #a second of updates, 64 of them, painted only when a frame is due
+        self.renderer.fps = 16
+        for n in range(64):
+            self.renderer.text(0,0,[('%d' % n,None)])
+            if self.renderer.due():
+                self.renderer.paint()
+            self.now += 1.0/64
+        self.assertEqual(len(self.stream.writes),16)
+        #the last frame is painted even when it isn't due, then the cursor moved
+        self.renderer.finish(0,0)
+        self.assertEqual(len(self.stream.writes),18)
+        self.assertEqual(''.join(char for char, color in self.renderer.painted[0]),'63')
+
+    def test_changed_cells_only(self):
+        self.renderer.text(0,0,[('hello',None)])
+        self.renderer.paint()
+        self.renderer.text(0,0,[('help!',None)])
+        self.renderer.paint()
+        self.assertEqual(self.stream.writes[-1],'\r\033[3Cp!')
+        #nothing changed, nothing written
+        self.renderer.paint()
+        self.assertEqual(len(self.stream.writes),2)
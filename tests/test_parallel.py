@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import subprocess
+import unittest
+import warnings
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+import unitstyle.unitstyle
+
+
+def run(names,**options):
+    suite = unittest.defaultTestLoader.loadTestsFromNames(names)
+    result = unitstyle.TestRunner(stream=StringIO(),format='json',**options).run(suite)
+    return result.testsRun, len(result.failures), len(result.errors)
+
+
+forkserver = unittest.skipUnless(
+    'forkserver' in getattr(multiprocessing,'get_all_start_methods',lambda: [])(),
+    "no fork server here")
+
+
+class ParallelTest(unittest.TestCase):
+    def test_module_fixtures_run_once(self):
+        serial = run(['tests.samples.module_fixtures'])
+        self.assertEqual(serial,(5,1,2))
+        self.assertEqual(run(['tests.samples.module_fixtures'],workers=3),serial)
+
+    @forkserver
+    def test_preload(self):
+        import tests.samples.preloaded
+        #workers forked from here instead would see this, not their parent
+        imported_in = tests.samples.preloaded.imported_in
+        tests.samples.preloaded.imported_in = None
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                #the server only imports what the first run in this process needs
+                counts = run(['tests.samples.module_fixtures','tests.samples.preloaded'],
+                             workers=3,preload=True)
+        finally:
+            tests.samples.preloaded.imported_in = imported_in
+        self.assertEqual(counts,(7,1,2))
+        self.assertEqual([str(w.message) for w in caught if 'preload' in str(w.message)],[])
+
+    @forkserver
+    def test_server_flags(self):
+        #the server is started with the flags this interpreter was
+        output = subprocess.check_output([
+            unitstyle.unitstyle.serverPython(),'-W','error::DeprecationWarning','-c',
+            'import sys; print(sys.warnoptions[-1]); print(sys.path == %r)' % (
+                unitstyle.unitstyle.importPath().split(os.pathsep),),
+        ])
+        self.assertEqual(output.decode().split(),['error::DeprecationWarning','True'])
@@ -0,0 +1,31 @@
+import json
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+
+
+class ProfileTest(unittest.TestCase):
+    def hotspots(self,**options):
+        """ {test name: [hotspot function names]} of the profiled tests """
+        suite = unittest.defaultTestLoader.loadTestsFromName('tests.samples.profiled')
+        stream = StringIO()
+        unitstyle.TestRunner(stream=stream,format='json',**options).run(suite)
+        return dict((o['test'].split('.')[-1],[h['function'] for h in o['hotspots']])
+                    for o in json.loads(stream.getvalue())['passes'] if 'hotspots' in o)
+
+    def test_every_test(self):
+        hotspots = self.hotspots(profile=True)
+        self.assertEqual(sorted(hotspots),['test_fast','test_slow'])
+        self.assertEqual(len(hotspots['test_slow']),5)
+
+    def test_threshold(self):
+        #only the test that took longer than 0.1s keeps its profile
+        hotspots = self.hotspots(profile=0.1,hotspots=2)
+        self.assertEqual(list(hotspots),['test_slow'])
+        self.assertEqual(len(hotspots['test_slow']),2)
+        #hottest first, by time in its own code
+        self.assertIn('sleep',hotspots['test_slow'][0])
@@ -0,0 +1,41 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+from tests.test_reporters import run
+
+#durations, and the start and end dates of json and junit
+times = re.compile(r'\d+\.\d+(e-?\d+)?|\w{3}, \d+ \w{3} \d{4} [\d:]+ \+0000|\d{4}-\d\d-\d\dT[\d:.]+')
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log = os.path.join(self.dir,'events')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def replay(self,format,**options):
+        stream = StringIO()
+        unitstyle.TestRunner(stream=stream,format=format).replay(self.log,**options)
+        return stream.getvalue()
+
+    def test_each_format(self):
+        for format in ('list','dots','jsstream','json','json-incremental','junit','progress','min','tap','spec'):
+            live = run('tests.samples.module_fixtures',format,log=self.log)
+            self.assertEqual(times.sub('',self.replay(format)),times.sub('',live),format)
+
+    def test_earlier_run(self):
+        run('tests.samples.module_fixtures','json',log=self.log)
+        run('tests.samples.class_fixtures','json',log=self.log)
+        self.assertEqual(json.loads(self.replay('json',run=0))['stats']['tests'],5)
+        self.assertNotEqual(json.loads(self.replay('json'))['stats']['tests'],5)
@@ -0,0 +1,155 @@
+import gc
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None #python 2
+from xml.etree import ElementTree
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+import unitstyle.unitstyle
+
+
+def run(name,format,**options):
+    suite = unittest.defaultTestLoader.loadTestsFromName(name)
+    stream = StringIO()
+    unitstyle.TestRunner(stream=stream,format=format,**options).run(suite)
+    return stream.getvalue()
+
+
+@unittest.skipUnless(hasattr(unittest.TestCase,'subTest'),"no subtests before python 3.4")
+class IncrementalJSONTest(unittest.TestCase):
+    def test_subtest_entries(self):
+        o = json.loads(run('tests.samples.subtests','json-incremental'))
+        states = dict((entry['test'],entry['state']) for entry in o['tests'])
+        self.assertEqual(states['tests.samples.subtests.Params.test_even (i=1)'],'failed')
+        self.assertEqual(states["tests.samples.subtests.Params.test_broken (part='broken')"],'error')
+        self.assertEqual(states['tests.samples.subtests.Params.test_pass'],'passed')
+        self.assertEqual((o['stats']['failures'],o['stats']['errors']),(1,1))
+
+    def test_same_as_json(self):
+        incremental = json.loads(run('tests.samples.subtests','json-incremental'))
+        whole = json.loads(run('tests.samples.subtests','json'))
+        self.assertEqual(
+            sorted(entry['test'] for entry in incremental['tests'] if entry['state'] in ('failed','error')),
+            sorted(entry['test'] for entry in whole['failures']+whole['errors']))
+
+
+class Trivial(unittest.TestCase):
+    def test_nothing(self):
+        pass
+
+
+class Discard(object):
+    def write(self,text):
+        pass
+
+    def flush(self):
+        pass
+
+
+@unittest.skipIf(tracemalloc is None,"no tracemalloc before python 3.4")
+class StreamingMemoryTest(unittest.TestCase):
+    def retained(self,tests,format):
+        """ memory still held once a run of this many tests is over """
+        suite = unittest.TestSuite(Trivial('test_nothing') for n in range(tests))
+        tracemalloc.start()
+        try:
+            result = unitstyle.TestRunner(stream=Discard(),format=format).run(suite)
+            del suite
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    def growth(self,format,tests=10000):
+        """ how much more a run of this many tests keeps than one of 1000 """
+        #the first run warms up whatever's cached along the way
+        self.retained(100,format)
+        fewer = self.retained(1000,format)
+        return self.retained(tests,format) - fewer
+
+    def test_incremental_json(self):
+        #about a byte a test. Keeping anything at all for each would be more
+        self.assertLess(self.growth('json-incremental'),9000)
+
+    def test_with_junit(self):
+        #with no reporter keeping them, the tests aren't kept for either
+        self.assertLess(self.growth(['json-incremental','junit']),9000)
+
+    def test_json_keeps_tests(self):
+        self.assertGreater(self.growth('json',2000),9000)
+
+
+class JUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir,'junit.xml')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_to(self,stream):
+        suite = unittest.defaultTestLoader.loadTestsFromName('tests.samples.module_fixtures')
+        with stream:
+            unitstyle.TestRunner(stream=stream,format='junit').run(suite)
+        with open(self.path) as f:
+            text = f.read()
+        return ElementTree.fromstring(text.encode('utf-8')).find('testsuite'), text
+
+    @unittest.skipIf(sys.version_info[0] < 3,"python 2 files can't say whether they can seek")
+    def test_totals_filled_in(self):
+        suite, text = self.run_to(open(self.path,'w'))
+        self.assertEqual(suite.get('tests'),'6')
+        self.assertEqual(suite.get('failures'),'1')
+        self.assertEqual(suite.get('errors'),'2')
+        self.assertTrue(text.endswith('</testsuites>\n'))
+
+    def test_append_mode(self):
+        suite, text = self.run_to(open(self.path,'a'))
+        self.assertEqual(suite.get('tests'),None)
+        self.assertEqual(suite.get('failures'),None)
+        #5 tests, and a test case for the tearDownModule error
+        self.assertEqual(len(suite.findall('testcase')),6)
+        self.assertIn('tests="6"',text[text.index('</testsuites>'):])
+        self.assertIn('errors="2"',text[text.index('</testsuites>'):])
+
+    @unittest.skipIf(unitstyle.unitstyle.fcntl is None,"no fcntl")
+    def test_append_flag(self):
+        #opened for appending by someone else, e.g. a shell's 2>>
+        fd = os.open(self.path,os.O_WRONLY|os.O_CREAT|os.O_APPEND)
+        suite, text = self.run_to(os.fdopen(fd,'w'))
+        self.assertEqual(suite.get('failures'),None)
+        self.assertIn('errors="2"',text[text.index('</testsuites>'):])
+
+
+def untimed(o):
+    """ json output without the times, which differ from run to run """
+    if isinstance(o,dict):
+        return dict((k,untimed(v)) for k, v in o.items() if k not in ('duration','start','end'))
+    if isinstance(o,list):
+        return [untimed(v) for v in o]
+    return o
+
+
+class MultiFormatTest(unittest.TestCase):
+    def test_same_as_single_formats(self):
+        streams = dict((fmt,StringIO()) for fmt in ('spec','tap','json'))
+        suite = unittest.defaultTestLoader.loadTestsFromName('tests.samples.module_fixtures')
+        unitstyle.TestRunner(stream=StringIO(),format=[(fmt,streams[fmt]) for fmt in ('spec','tap','json')]).run(suite)
+        spec = re.compile(r'passing \([0-9.]+s\)')
+        self.assertEqual(spec.sub('',streams['spec'].getvalue()),
+                         spec.sub('',run('tests.samples.module_fixtures','spec')))
+        self.assertEqual(streams['tap'].getvalue(),run('tests.samples.module_fixtures','tap'))
+        self.assertEqual(untimed(json.loads(streams['json'].getvalue())),
+                         untimed(json.loads(run('tests.samples.module_fixtures','json'))))
@@ -0,0 +1,33 @@
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+from tests.samples import instances
+
+
+def run(names,**options):
+    suite = unittest.defaultTestLoader.loadTestsFromNames(names)
+    return unitstyle.TestRunner(stream=StringIO(),format='json',**options).run(suite)
+
+
+class ThreadsTest(unittest.TestCase):
+    def tearDown(self):
+        del instances.instances[:]
+
+    def test_same_as_serial(self):
+        names = ['tests.samples.module_fixtures','tests.samples.class_fixtures']
+        serial = run(names)
+        threaded = run(names,threads=3)
+        self.assertEqual((threaded.testsRun,len(threaded.failures),len(threaded.errors)),
+                         (serial.testsRun,len(serial.failures),len(serial.errors)))
+
+    @unittest.skipUnless(hasattr(unittest.TestSuite,'_removeTestAtIndex'),"suites let go of tests from python 3.4")
+    def test_tests_let_go(self):
+        result = run(['tests.samples.instances.Sync'],threads=2)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_no_profile(self):
+        self.assertRaises(ValueError,run,['tests.samples.instances.Sync'],threads=2,profile=True)
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import unitstyle
+import unitstyle.unitstyle
+
+
+FILES = {
+    '__init__.py': '',
+    'helper.py': 'def value():\n    return 1\n',
+    'test_uses.py': (
+        'import unittest\n'
+        'from watched import helper\n\n\n'
+        'class Uses(unittest.TestCase):\n'
+        '    def test_value(self):\n'
+        '        self.assertEqual(helper.value(),2)\n'),
+    'test_other.py': (
+        'import unittest\n\n\n'
+        'class Other(unittest.TestCase):\n'
+        '    def test_nothing(self):\n'
+        '        pass\n'),
+}
+
+
+class WatchingRunner(unitstyle.TestRunner):
+    """ changes helper.py after the first run, and stops after the second """
+    def run(self,test):
+        ids = sorted(t.id() for t in unitstyle.unitstyle.flattenSuite(test))
+        result = super(WatchingRunner,self).run(test)
+        self.runs.append((ids,result.wasSuccessful()))
+        if len(self.runs) > 1:
+            raise KeyboardInterrupt()
+        self.change('helper.py','def value():\n    return 2\n')
+        return result
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.package = os.path.join(self.dir,'watched')
+        os.mkdir(self.package)
+        for name, source in FILES.items():
+            self.change(name,source)
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name == 'watched' or name.startswith('watched.'):
+                del sys.modules[name]
+        if self.dir in sys.path:
+            sys.path.remove(self.dir)
+        shutil.rmtree(self.dir)
+
+    def change(self,name,source):
+        path = os.path.join(self.package,name)
+        with open(path,'w') as f:
+            f.write(source)
+        #make sure the change shows, even within the same second
+        mtime = os.stat(path).st_mtime
+        os.utime(path,(mtime+10,mtime+10))
+
+    def test_dependents_rerun(self):
+        runner = WatchingRunner(stream=StringIO(),format='json')
+        runner.runs = []
+        runner.change = self.change
+        runner.watch(self.package,top_level_dir=self.dir,interval=0.05)
+        self.assertEqual(runner.runs,[
+            (['watched.test_other.Other.test_nothing','watched.test_uses.Uses.test_value'],False),
+            #only the test module importing helper, which now sees the change
+            (['watched.test_uses.Uses.test_value'],True),
+        ])
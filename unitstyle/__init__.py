@@ -1,4 +1,4 @@
 try:
-    from unitstyle.unitstyle import TestRunner
+    from unitstyle.unitstyle import TestRunner, discover
 except ImportError:
-    from unitstyle import TestRunner # this worked better for python 2.7 venv
+    from unitstyle import TestRunner, discover # this worked better for python 2.7 venv
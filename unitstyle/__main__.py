@@ -0,0 +1,5 @@
+import sys
+
+from unitstyle.unitstyle import main
+
+sys.exit(main())
@@ -5,7 +5,7 @@
 This file is simply a library to wrap unittest's TextTestRunner and provide
 several output formats that match those provided by mocha: https://mochajs.org/#reporters
 
-Current available formats: list,dots,jsstream,json,progress,min,tap,spec
+Current available formats: list,dots,jsstream,json,json-incremental,junit,progress,min,tap,spec
 
 to use: import TestRunner from this file, pass in the desired format, and run your suite:
 TestRunner(verbosity=2,format='json').run(suite)
@@ -17,13 +17,392 @@ except ImportError:
     import unittest
 import sys, os
 import time
+import calendar
+import traceback
+import fnmatch
 import json
+import re
+import signal
+import heapq
+import collections
+import ast
+import cProfile
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None #python2
+import multiprocessing
+import subprocess
+import tempfile
+import atexit
+import warnings
+import threading
+import socket
+import select
+import struct
+import io
+try:
+    import queue
+except ImportError:
+    import Queue as queue #python2
+try:
+    import asyncio
+    import concurrent.futures
+except ImportError:
+    asyncio = None #python2
+try:
+    import contextvars
+except ImportError:
+    contextvars = None #before python 3.7
+try:
+    import fcntl
+except ImportError:
+    fcntl = None #windows
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+try:
+    from importlib import reload
+except ImportError:
+    pass #python2's is a builtin
+import sqlite3
+import pickle
+from xml.sax.saxutils import escape, quoteattr
+
+#best clock available for timing individual tests
+timer = getattr(time,'perf_counter',time.time)
+
+#the ids unittest gives errors in setUpClass, setUpModule and the like
+fixture_id = re.compile(r'^(\w+) \((.*)\)$')
+#the ids of subtests: their test's id, then [msg] and/or (params)
+subtest_id = re.compile(r'^(\w+(?:\.\w+)+) ([\[(].*)$')
 
 
 class ExpectedFailure(Exception):
     pass
 
 
+class RemoteError(object):
+    """ An error that happened in another process. Holds just enough
+        (already formatted) information for a Result to display it
+    """
+    __slots__ = ('name','message','trace','failure')
+
+    def __init__(self,name,message,trace,failure):
+        self.name=name
+        self.message=message
+        self.trace=trace
+        #whether this was the test's failureException rather than an error
+        self.failure=failure
+
+
+class TestRecord(object):
+    """ What a Result remembers about a test once it has run. Looks enough
+        like a TestCase (id(), shortDescription()) for the reporters, without
+        keeping the test instance and everything it holds alive.
+        Also stands in for tests that only exist in a worker process
+    """
+    __slots__ = ('test_id','description','failureException',
+                 'status','duration','failNum','error','hotspots','memory')
+
+    def __init__(self,test_id,description=None,failureException=None):
+        self.test_id=test_id
+        self.description=description
+        #needed by unittest to tidy up tracebacks
+        self.failureException=failureException
+        self.status=None
+        self.duration=None
+        self.failNum=None
+        self.error=None
+        self.hotspots=None
+        self.memory=None
+
+    @classmethod
+    def fromTest(cls,test):
+        return cls(test.id(),test.shortDescription(),getattr(test,'failureException',None))
+
+    def id(self):
+        return self.test_id
+
+    def shortDescription(self):
+        return self.description
+
+    def __str__(self):
+        return self.test_id
+
+
+class Trace(object):
+    """ A failure's traceback. Captured when the failure happens, but only
+        formatted into text when something asks for str(trace), so reporters
+        that never show traces never pay for them.
+        Traces longer than `length` characters are cut down to their end
+    """
+    __slots__ = ('exception','output','text','length')
+
+    def __init__(self,exception=None,output='',text=None,length=None):
+        self.exception=exception #a traceback.TracebackException
+        self.output=output #anything captured by buffer=True
+        self.text=text
+        self.length=length
+
+    def __str__(self):
+        if self.text is None:
+            self.text = ''.join(self.exception.format()) + self.output
+            self.exception = None
+        if self.length and len(self.text) > self.length:
+            #keep the end, that's where the actual error is
+            lines = self.text[-self.length:].split('\n',1)
+            return 'Traceback (most recent call last):\n  ...\n' + lines[-1]
+        return self.text
+
+    def __repr__(self):
+        return repr(str(self))
+
+
+def captureTrace(result,err,test,depth=None,length=None):
+    """ the lazy equivalent of unittest's TestResult._exc_info_to_string.
+        depth limits the trace to that many of the innermost frames
+    """
+    if not hasattr(traceback,'TracebackException'): #python2
+        return Trace(text=unittest.TestResult._exc_info_to_string(result,err,test),length=length)
+
+    exctype, value, tb = err
+    if hasattr(result,'_clean_tracebacks'):
+        tb = result._clean_tracebacks(exctype,value,tb,test)
+    else:
+        while tb and result._is_relevant_tb_level(tb):
+            tb = tb.tb_next
+    exception = traceback.TracebackException(
+        exctype,value,tb,
+        limit=-depth if depth else None,
+        lookup_lines=False,
+        capture_locals=getattr(result,'tb_locals',False)
+    )
+
+    #the captured output is gone once the test is over, so grab it now
+    output = ''
+    if result.buffer:
+        stdout = sys.stdout.getvalue()
+        stderr = sys.stderr.getvalue()
+        if stdout:
+            if not stdout.endswith('\n'):
+                stdout += '\n'
+            output += unittest.result.STDOUT_LINE % stdout
+        if stderr:
+            if not stderr.endswith('\n'):
+                stderr += '\n'
+            output += unittest.result.STDERR_LINE % stderr
+    return Trace(exception,output,length=length)
+
+
+class TestInfo(object):
+    """ A test's names, split out once so reporters don't have to keep
+        re-deriving them from test.id()
+    """
+    __slots__ = ('test_id','module','cls','method','description','name')
+
+    def __init__(self,test):
+        self.test_id = test.id()
+        parts = self.test_id.split('.')
+        self.module = parts[-3] if len(parts) > 2 else None
+        self.cls = parts[-2] if len(parts) > 1 else None
+        self.method = parts[-1]
+        self.description = test.shortDescription()
+        #what to call the test on its own line
+        self.name = self.method if self.description is None else self.description
+
+
+def remoteError(result,err,test):
+    """ err as a RemoteError, with its trace formatted the way result would """
+    if isinstance(err,RemoteError):
+        return err
+    return RemoteError(
+        err[0].__name__,
+        str(err[1]),
+        str(captureTrace(result,err,test,result.trace_depth)),
+        bool(test.failureException) and issubclass(err[0],test.failureException)
+    )
+
+
+def errorSummary(err):
+    """ one line description of an exc_info tuple or RemoteError """
+    if isinstance(err,RemoteError):
+        return "%s: %s" % (err.name,err.message)
+    return "%s: %s" % (err[0].__name__,err[1])
+
+
+class Tally(object):
+    """ list stand-in that only counts what gets appended to it """
+    def __init__(self):
+        self.count=0
+
+    def append(self,item):
+        self.count +=1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(())
+
+
+class FileTracer(object):
+    """ Records which source files under root run while it's on. Only
+        function calls are traced, not lines, to keep the overhead down
+    """
+    def __init__(self,root=None):
+        self.root = os.path.abspath(root or os.getcwd())
+        self.files = set()
+        self.previous = None
+        self.ignore = set([os.path.abspath(__file__).rstrip('co')])
+
+    def trace(self,frame,event,arg):
+        self.files.add(frame.f_code.co_filename)
+
+    def start(self):
+        self.files = set()
+        self.previous = sys.gettrace()
+        sys.settrace(self.trace)
+
+    def stop(self):
+        """ stops tracing, and returns the files seen, relative to root """
+        sys.settrace(self.previous)
+        seen = set()
+        for filename in self.files:
+            if filename.startswith('<'): #<string>, <frozen ...> and such
+                continue
+            path = os.path.abspath(filename)
+            if path.startswith(self.root+os.sep) and path not in self.ignore:
+                seen.add(os.path.relpath(path,self.root))
+        return seen
+
+
+class Profiler(object):
+    """ Profiles one test at a time with cProfile. Tests that took at least
+        threshold seconds get the `top` functions that spent the most time
+        in their own code picked out as hotspots
+    """
+    def __init__(self,top=5,threshold=0):
+        self.top = top
+        self.threshold = threshold
+        self.profile = None
+        self.running = False
+        self.ignore = os.path.abspath(__file__).rstrip('co')
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.running = True
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.running = False
+
+    def hotspots(self):
+        """ the hottest functions of the last profile, hottest first """
+        self.profile.create_stats()
+        stats = [(key,value) for key,value in self.profile.stats.items()
+                 if key[0] != self.ignore and key[2] != "<method 'disable' of '_lsprof.Profiler' objects>"]
+        self.profile = None
+        return [{
+            'function': function,
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'time': own,
+            'cumulative': cumulative,
+        } for (filename,line,function),(primitive,calls,own,cumulative,callers)
+          in heapq.nlargest(self.top,stats,key=lambda stat: stat[1][2])]
+
+
+class MemoryTracker(object):
+    """ Measures, with tracemalloc, how much memory each test allocated at
+        its peak and how much more it held when it finished than once its
+        setUp was done. What setUp keeps on the test lives as long as the
+        test does, so it doesn't count.
+        Tests still holding at least threshold bytes are flagged as leaking
+    """
+    threshold = 1024*1024
+
+    def __init__(self,threshold=None):
+        if tracemalloc is None:
+            raise RuntimeError("memory tracking needs tracemalloc (python 3.4+)")
+        if threshold is not None:
+            self.threshold = threshold
+        self.running = False
+        self.started = False
+        self.before = 0
+        self.afterSetUp = 0
+        self.test = None
+
+    def start(self,test=None):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+        if hasattr(tracemalloc,'reset_peak'):
+            tracemalloc.reset_peak()
+        self.before = self.afterSetUp = tracemalloc.get_traced_memory()[0]
+        self.running = True
+        if test is not None:
+            self.watchSetUp(test)
+
+    def watchSetUp(self,test):
+        """ measure again once test's setUp (and asyncSetUp) is done """
+        name = '_callSetUp' if hasattr(test,'_callSetUp') else 'setUp'
+        setUp = getattr(test,name,None)
+        if setUp is None or not hasattr(test,'__dict__'):
+            return
+        def measuredSetUp(*args,**kwargs):
+            result = setUp(*args,**kwargs)
+            self.afterSetUp = tracemalloc.get_traced_memory()[0]
+            return result
+        #shadowed on the instance until stop(), which puts it back
+        test.__dict__[name] = measuredSetUp
+        self.test = (test,name)
+
+    def stop(self):
+        """ stops measuring, and returns the test's numbers """
+        current, peak = tracemalloc.get_traced_memory()
+        self.running = False
+        if self.test is not None:
+            test, name = self.test
+            test.__dict__.pop(name,None)
+            self.test = None
+        retained = current - self.afterSetUp
+        return {
+            #before python 3.9 the peak can't be reset between tests
+            'peak': peak - self.before if hasattr(tracemalloc,'reset_peak') else None,
+            'retained': retained,
+            'leaked': retained >= self.threshold,
+        }
+
+    def close(self):
+        """ stop tracemalloc, if this started it """
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+
+def memorySize(size):
+    """ a number of bytes, for people """
+    if abs(size) < 1024:
+        return '%dB' % size
+    for unit in ('KB','MB','GB'):
+        size /= 1024.0
+        if abs(size) < 1024:
+            break
+    return '%.1f%s' % (size,unit)
+
+
+def hotspotName(hotspot):
+    """ file:line(function) of a hotspot, or just the name of a builtin """
+    if hotspot['file'] == '~':
+        return hotspot['function']
+    return '%s:%d(%s)' % (os.path.basename(hotspot['file']),hotspot['line'],hotspot['function'])
+
+
 class Result(unittest.TestResult):
     """ Generic TestResult wrapper class
         to handle repetitive boilerplate things
@@ -40,6 +419,39 @@ class Result(unittest.TestResult):
     color_names = ('black', 'red', 'green', 'yellow', 'blue', 'magenta', 'cyan', 'white')
     escape='\033[%sm'
     reset=escape % ("0",)
+    #non-interactive output is held back until this many characters
+    #are waiting, or for at most this many seconds
+    flush_size=8192
+    flush_interval=0.5
+    #tests taking longer than `slow` seconds get called out, like mocha.
+    #The `slowest` of those are listed again in the summary
+    slow=0.075
+    slowest=5
+    #limits on how much of a failure's traceback is shown: the number of
+    #innermost frames, and the number of characters. None for everything
+    trace_depth=None
+    trace_length=None
+    #a History to record every finished test in, if any
+    history=None
+    #a FileTracer, to record which files each test runs, if any
+    tracer=None
+    #a Profiler, to find each test's hotspots, if any
+    profiler=None
+    #a MemoryTracker, to measure each test's memory use, if any
+    tracker=None
+    #an EventLog to write every test event to, if any
+    log=None
+    #how many tests were left out for not being affected by a change
+    unaffected=0
+    #how many async tests ran at once, for a run with `concurrency`:
+    #{'tests': how many, 'peak': most at once, 'average': on average}
+    concurrency=None
+    #the Result doing the counting, when this is one of several reporters
+    #fed by a MultiResult. Outcomes and records are then taken from it
+    leader=None
+    #whether the tests of each outcome are kept, for a report at the end.
+    #Reporters writing each test out as it finishes only count them
+    keeps_outcomes=True
 
     def __init__(self,stream,descriptions,verbosity,count):
         super(Result,self).__init__(stream,descriptions,verbosity)
@@ -49,6 +461,8 @@ class Result(unittest.TestResult):
         self.testCount=count
         self.failCount=0
         self.successes = []
+        if not self.keeps_outcomes:
+            self.countOutcomes()
 
         #determine whether the output stream can handle colors
         plat = sys.platform
@@ -60,6 +474,24 @@ class Result(unittest.TestResult):
         else:
             self.supports_color = True
 
+        #only a person watching a terminal needs to see every fragment right away
+        self.interactive = is_a_tty
+        self.pending = []
+        self.pendingSize = 0
+        self.pendingLock = threading.Lock()
+        self.pendingSince = None
+        self.flusher = None
+        self.flushAfterTest = False
+
+        self.testStart = timer()
+        self.slowTests = [] #heap of the slowest (duration,test id,hotspots)
+        self.leaks = [] #(memory,test id) of tests flagged by the tracker
+
+        #the test being run, and the record that will outlive it
+        self.currentTest = None
+        self.current = None
+        self.currentInfo = None
+
     def stopTestRun(self,starttime,stoptime):
         super(Result,self).stopTestRun()
         #break and newline after dots
@@ -79,6 +511,14 @@ class Result(unittest.TestResult):
         #print all other test statuses
         if len(self.skipped):
             self.write("  %d pending\n"%len(self.skipped),'blue')
+        if self.unaffected:
+            self.write("  %d unaffected by changes, not run\n"%self.unaffected,'lightblack')
+        if self.concurrency:
+            self.write("  %d async, up to %d at once (%.1f on average)\n" % (
+                self.concurrency['tests'],
+                self.concurrency['peak'],
+                self.concurrency['average'],
+            ),'lightblack')
         if len(self.errors):
             self.write(self.icon['cross']+' %d error%s\n'% (
                        len(self.errors),
@@ -87,47 +527,308 @@ class Result(unittest.TestResult):
         if len(self.failures):
             self.write(self.icon['cross']+' %d failing\n' % len(self.failures), 'red')
 
+        if self.slowTests:
+            self.write("\n  slowest:\n",'white')
+            for duration, test_id, hotspots in sorted(self.slowTests,reverse=True):
+                self.write("    %.3fs" % duration,'red')
+                self.write(" %s\n" % test_id,'lightblack')
+                for hotspot in hotspots or ():
+                    self.write("        %.3fs %s (%d call%s)\n" % (
+                        hotspot['time'],
+                        hotspotName(hotspot),
+                        hotspot['calls'],
+                        '' if hotspot['calls'] == 1 else 's',
+                    ),'lightblack')
+
+        if self.leaks:
+            self.write("\n  leaking:\n",'white')
+            for memory, test_id in self.leaks:
+                self.write("    %s retained" % memorySize(memory['retained']),'red')
+                if memory['peak'] is not None:
+                    self.write(" (%s peak)" % memorySize(memory['peak']),'lightblack')
+                self.write(" %s\n" % test_id,'lightblack')
+
         #going to print some error traces, so make some room
         if not self.wasSuccessful():
             self.write("\n")
 
         errlist = {}
         for e in self.errors:
-            e[0].type='error'
-            errlist[e[0].failNum] = e
+            errlist[e[0].failNum] = e+('error',)
         for f in self.failures:
-            f[0].type='failure'
-            errlist[f[0].failNum] = f
+            errlist[f[0].failNum] = f+('failure',)
 
         for x in sorted(map(int,errlist.keys())):
-            self.writeTrace(errlist[x][0],errlist[x][1],x,type=errlist[x][0].type)
+            self.writeTrace(errlist[x][0],errlist[x][1],x,type=errlist[x][2])
 
         #put next prompt on newline without extra spaces
         self.write("\n")
 
 
+    def countOutcomes(self):
+        """ only count the tests of each outcome, rather than keeping them """
+        self.successes = Tally()
+        self.failures = Tally()
+        self.errors = Tally()
+        self.skipped = Tally()
+        self.expectedFailures = Tally()
+        self.unexpectedSuccesses = Tally()
+
+    def addDuration(self,test,elapsed):
+        #records have their durations. unittest's list of them (python 3.12+)
+        #would keep a line for every test
+        pass
+
+    def follow(self,leader):
+        """ report the tests counted by leader, rather than counting them here """
+        self.leader = leader
+        self.successes = leader.successes
+        self.failures = leader.failures
+        self.errors = leader.errors
+        self.skipped = leader.skipped
+        self.expectedFailures = leader.expectedFailures
+        self.unexpectedSuccesses = leader.unexpectedSuccesses
+        self.slowTests = leader.slowTests
+        self.leaks = leader.leaks
+
+    def startTest(self,test):
+        if self.leader is not None:
+            self.testsRun = self.leader.testsRun
+            return
+        super(Result,self).startTest(test)
+        info = self.info(test)
+        self.currentTest = test
+        self.currentInfo = info
+        self.current = TestRecord(info.test_id,info.description,test.failureException)
+        self.testStart = timer()
+        if self.log is not None:
+            if info.description is not None:
+                self.log.add(('describe',info.test_id,info.description))
+            self.logEvent('startTest',test)
+        if self.tracer is not None:
+            self.tracer.start()
+        if self.tracker is not None:
+            self.tracker.start(test)
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def traceFiles(self,test,files):
+        """ remember which source files test ran """
+        if self.history is not None:
+            self.history.addFiles(self.info(test).test_id,files)
+
+    def stopWatching(self,test):
+        """ stop profiling and measuring test once its outcome is known """
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+            if self.elapsed() >= self.profiler.threshold:
+                self.profiled(test,self.profiler.hotspots())
+        if self.tracker is not None and self.tracker.running:
+            self.measured(test,self.tracker.stop())
+
+    def profiled(self,test,hotspots):
+        self.record(test).hotspots = hotspots
+        self.logEvent('profiled',test,hotspots)
+
+    def measured(self,test,memory):
+        record = self.record(test)
+        record.memory = memory
+        if memory['leaked']:
+            self.leaks.append((memory,record.test_id))
+        self.logEvent('measured',test,memory)
+
+    def logEvent(self,name,test,*args):
+        """ write an event to the event log, if there is one """
+        if self.log is not None:
+            self.log.add((name,self.record(test).test_id,self.elapsed())+args)
+
+    def info(self,test):
+        """ the TestInfo for test. The running test's is worked out once, at
+            startTest, and let go of at stopTest
+        """
+        if self.leader is not None:
+            return self.leader.info(test)
+        if test is self.currentTest:
+            return self.currentInfo
+        #fixture errors, records, or a test that's done
+        return TestInfo(test)
+
+    def record(self,test):
+        """ the TestRecord for test. This is what gets stored, and where
+            per-test details like failNum and duration live
+        """
+        if isinstance(test,TestRecord):
+            return test
+        if self.leader is not None:
+            return self.leader.record(test)
+        if test is not self.currentTest:
+            #errors from class and module fixtures come without a startTest
+            info = self.info(test)
+            self.currentTest = test
+            self.currentInfo = info
+            self.current = TestRecord(info.test_id,info.description,
+                                      getattr(test,'failureException',None))
+        return self.current
+
+    def elapsed(self):
+        """ seconds since the current test started """
+        if self.leader is not None:
+            return self.leader.elapsed()
+        return timer() - self.testStart
+
+    def speed(self,duration):
+        """ mocha's speed rating: fast, medium (over half of slow), or slow """
+        if duration > self.slow:
+            return 'slow'
+        elif duration > self.slow/2.0:
+            return 'medium'
+        return 'fast'
+
+    def writeDuration(self,test):
+        duration = self.record(test).duration
+        speed = self.speed(duration)
+        if speed != 'fast':
+            self.write(" (%dms)" % (duration*1000),'red' if speed == 'slow' else 'yellow')
+
     def addSuccess(self,test):
-        super(Result,self).addSuccess(test)
-        self.successes.append(test)
+        if self.leader is not None:
+            return
+        self.stopWatching(test)
+        record = self.record(test)
+        super(Result,self).addSuccess(record)
+        record.status = 'passed'
+        record.duration = self.elapsed()
+        self.successes.append(record)
+        self.logEvent('addSuccess',test)
+
+    def addSkip(self,test,reason):
+        if self.leader is not None:
+            return
+        self.stopWatching(test)
+        record = self.record(test)
+        super(Result,self).addSkip(record,reason)
+        record.status = 'skipped'
+        record.duration = self.elapsed()
+        self.logEvent('addSkip',test,reason)
+
+    def stopTest(self,test):
+        if self.leader is None:
+            self.finishTest(test)
+        if self.flushAfterTest:
+            self.flushAfterTest = False
+            self.flush()
+
+    def finishTest(self,test):
+        """ stopTest's bookkeeping """
+        self.stopWatching(test)
+        if self.tracer is not None:
+            self.traceFiles(test,self.tracer.stop())
+        super(Result,self).stopTest(test)
+        record = self.record(test)
+        record.duration = self.elapsed()
+        if self.slowest and record.duration > self.slow:
+            if len(self.slowTests) < self.slowest:
+                heapq.heappush(self.slowTests,(record.duration,record.test_id,record.hotspots))
+            else:
+                heapq.heappushpop(self.slowTests,(record.duration,record.test_id,record.hotspots))
+        if self.history is not None:
+            self.history.add(record)
+        self.logEvent('stopTest',test)
+        #done with the test instance, let it go
+        self.currentTest = None
+        self.currentInfo = None
 
     def addFailure(self,test,err):
-        super(Result,self).addFailure(test,err)
+        self.flushAfterTest = True
+        if self.leader is not None:
+            return
+        self.stopWatching(test)
+        record = self.record(test)
+        super(Result,self).addFailure(record,err)
         self.failCount +=1
-        test.failNum = self.failCount
+        record.failNum = self.failCount
+        record.status = 'failed'
+        record.duration = self.elapsed()
+        record.error = errorSummary(err)
+        if self.log is not None:
+            self.logEvent('addFailure',test,remoteError(self,err,test))
 
     def addError(self,test,err):
-        super(Result,self).addError(test,err)
+        self.flushAfterTest = True
+        if self.leader is not None:
+            return
+        self.stopWatching(test)
+        record = self.record(test)
+        super(Result,self).addError(record,err)
         self.failCount +=1
-        test.failNum = self.failCount
+        record.failNum = self.failCount
+        record.status = 'error'
+        record.duration = self.elapsed()
+        record.error = errorSummary(err)
+        if self.history is not None:
+            #fixture errors never get to stopTest, and count against
+            #the class or module, so a rerun picks up its tests
+            fixture = fixture_id.match(record.test_id)
+            if fixture:
+                self.history.addFixtureError(fixture.group(2))
+        if self.log is not None:
+            self.logEvent('addError',test,remoteError(self,err,test))
+
+    def addSubTest(self,test,subtest,err):
+        if err is None:
+            return
+        self.flushAfterTest = True
+        if self.leader is not None:
+            return
+        #same as unittest's, but subtests get a record of their own
+        #and errors may come from a worker process
+        if isinstance(err,RemoteError):
+            failed = err.failure
+        else:
+            failed = issubclass(err[0],test.failureException)
+        if self.failfast:
+            self.stop()
+        record = TestRecord.fromTest(subtest)
+        (self.failures if failed else self.errors).append(
+            (record,self._exc_info_to_string(err,test)))
+        #a test is only as good as its subtests
+        if self.record(test).status is None:
+            self.record(test).status = 'failed' if failed else 'error'
+        self._mirrorOutput = True
+        self.failCount +=1
+        record.failNum = self.failCount
+        record.status = 'failed' if failed else 'error'
+        record.duration = self.elapsed()
+        record.error = errorSummary(err)
+        if self.log is not None:
+            self.logEvent('addSubTest',test,
+                          TestRecord(subtest.id(),subtest.shortDescription()),
+                          remoteError(self,err,subtest))
+
+    def subTestRecord(self,test,subtest,err):
+        """ for reporters listing failed subtests as tests of their own:
+            a record of subtest, and whether it failed rather than errored
+        """
+        record = TestRecord.fromTest(subtest)
+        record.duration = self.elapsed()
+        failed = err.failure if isinstance(err,RemoteError) else issubclass(err[0],test.failureException)
+        return record, failed
 
     def addExpectedFailure(self,test,err):
-        super(Result,self).addExpectedFailure(test,err)
+        super(Result,self).addExpectedFailure(self.record(test),err)
         self.addSuccess(test)
 
     def addUnexpectedSuccess(self,test):
-        super(Result,self).addUnexpectedSuccess(test)
+        super(Result,self).addUnexpectedSuccess(self.record(test))
         self.addFailure(test,(ExpectedFailure,ExpectedFailure("Test expected Failure, but passed"),None))
 
+    def _exc_info_to_string(self,err,test):
+        """ returns a lazy Trace rather than a string. str() it to get the text """
+        #errors from worker processes arrive pre-formatted
+        if isinstance(err,RemoteError):
+            return Trace(text=err.trace,length=self.trace_length)
+        return captureTrace(self,err,test,self.trace_depth,self.trace_length)
+
     def colorize(self,text,color):
         """ supports color names: black,red,green,yellow,blue,magenta,cyan,white
             and lightblack, lightred, etc.. for bold colors
@@ -145,7 +846,58 @@ class Result(unittest.TestResult):
     def write(self,text,color=None):
         if color:
             text = self.colorize(text,color)
-        self.stream.write(text)
+        if self.interactive:
+            self.stream.write(text)
+            self.stream.flush()
+            return
+        with self.pendingLock:
+            self.pending.append(text)
+            self.pendingSize += len(text)
+            if self.pendingSize < self.flush_size:
+                if self.pendingSince is None:
+                    self.pendingSince = timer()
+                #flushed from a thread of its own, so a test that hangs doesn't hold it back
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self.flushLater)
+                    self.flusher.daemon = True
+                    self.flusher.start()
+                return
+            self.writePending()
+
+    def flushLater(self):
+        """ the flusher thread: writes out what's been held back for
+            flush_interval seconds. It stays around while there's more to come,
+            so there's one for a run of writes, and ends once nothing has been
+            held back for that long
+        """
+        idle = False
+        while True:
+            with self.pendingLock:
+                if self.pendingSince is None:
+                    if idle:
+                        self.flusher = None
+                        return
+                    idle, wait = True, self.flush_interval
+                else:
+                    idle = False
+                    wait = self.pendingSince + self.flush_interval - timer()
+                    if wait <= 0:
+                        self.writePending()
+                        continue
+            time.sleep(wait)
+
+    def flush(self):
+        """ write out anything held back by write() """
+        with self.pendingLock:
+            self.writePending()
+
+    def writePending(self):
+        """ flush(), with pendingLock held """
+        if self.pending:
+            self.stream.write(''.join(self.pending))
+            self.pending = []
+            self.pendingSize = 0
+        self.pendingSince = None
         self.stream.flush()
 
     def writeTrace(self,test,trace,n,type='failure'):
@@ -154,28 +906,28 @@ class Result(unittest.TestResult):
         else:
             color='red'
 
-        testname = test.id().split('.')
-        desc = test.shortDescription()
+        info = self.info(test)
+        desc = info.description
         if desc is None:
             desc = ''
 
-        try:
+        if info.module is not None:
             self.write("  %d) %s.%s.%s %s\n" % (
                 n,
-                testname[-3],
-                testname[-2],
-                testname[-1],
+                info.module,
+                info.cls,
+                info.method,
                 desc,
             ),'white')
-        except:
+        else:
             self.write("  %d) %s %s\n" % (
                 n,
-                ".".join(testname),
+                info.test_id,
                 desc,
             ),'white')
         #self.write(str(f[0]),'white')
 
-        trace = self.reindent(trace,5)
+        trace = self.reindent(str(trace),5)
         trace = trace.split('\n')
         trace.pop() #removes last newline
         assertion = trace.pop()
@@ -186,21 +938,45 @@ class Result(unittest.TestResult):
         self.write(trace+"\n")
 
     def testToJSON(self,test,**kwargs):
+        record = self.record(test)
         o = {
-            'test':test.id(),
-            'description':test.shortDescription()
+            'test':record.test_id,
+            'description':record.description
         }
-        if 'error' in kwargs and type(kwargs['error']) is tuple:
-            kwargs['error'] = "%s: %s" % (
-                kwargs['error'][0].__name__,
-                kwargs['error'][1]
-            )
+        duration = record.duration
+        if duration is not None:
+            o['duration'] = duration
+            o['speed'] = self.speed(duration)
+        if record.hotspots:
+            o['hotspots'] = record.hotspots
+        if record.memory is not None:
+            o['memory'] = record.memory
+        if 'error' in kwargs and (type(kwargs['error']) is tuple or
+                                  isinstance(kwargs['error'],RemoteError)):
+            kwargs['error'] = errorSummary(kwargs['error'])
         o.update(kwargs)
         if 'string' in kwargs and kwargs['string'] == False:
             return o
         return json.dumps(o)
 
 
+    def stats(self,starttime,stoptime):
+        stats = {
+            'tests': self.testsRun,
+            'passed': len(self.successes),
+            'errors': len(self.errors),
+            'failures': len(self.failures),
+            'skipped': len(self.skipped),
+            'unaffected': self.unaffected,
+            'successful': self.wasSuccessful(),
+            'start': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(starttime)),
+            'end': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(stoptime)),
+            'duration': stoptime-starttime
+        }
+        if self.concurrency:
+            stats['concurrency'] = self.concurrency
+        return stats
+
     def reindent(self,str,n=2):
         return "\n".join(
             map(lambda x: " "*n+x,
@@ -225,53 +1001,190 @@ class Result(unittest.TestResult):
             self.stream.write('\033[900D')#this assumes 900 char max length line
 
 
+def terminalWidth(stream,default=80):
+    """ how many columns the terminal stream writes to has """
+    try:
+        return os.get_terminal_size(stream.fileno()).columns or default
+    except (AttributeError,ValueError,OSError,io.UnsupportedOperation):
+        return default #python2, or not a terminal
 
 
+class Renderer(object):
+    """ Keeps a model of a block of lines at the bottom of a terminal, and
+        repaints just the cells that changed since the last frame, at most
+        fps times a second. Rows are kept narrower than the terminal, so
+        the cursor can be moved around them without anything wrapping
+    """
+    fps = 20
+
+    def __init__(self,stream,colorize,width=None):
+        self.stream = stream
+        self.colorize = colorize
+        self.width = (width or terminalWidth(stream)) - 1
+        #rows of (character, color) cells: as they should be, and as painted
+        self.rows = []
+        self.painted = []
+        self.dirty = set()
+        #the row of the block the cursor is on
+        self.cursor = 0
+        self.lastPaint = 0.0
+
+    def set(self,row,col,char,color=None):
+        """ put one character at row, col """
+        if col >= self.width:
+            return
+        while len(self.rows) <= row:
+            self.rows.append([])
+        line = self.rows[row]
+        while len(line) <= col:
+            line.append((' ',None))
+        if line[col] != (char,color):
+            line[col] = (char,color)
+            self.dirty.add(row)
+
+    def text(self,row,col,parts):
+        """ replace row from col on with (text, color) parts """
+        while len(self.rows) <= row:
+            self.rows.append([])
+        line = self.rows[row][:col]
+        line.extend([(' ',None)]*(col-len(line)))
+        for text, color in parts:
+            line.extend((char,color) for char in text)
+        line = line[:self.width]
+        if line != self.rows[row]:
+            self.rows[row] = line
+            self.dirty.add(row)
+
+    def due(self):
+        """ whether it's been long enough since the last frame to paint another """
+        return timer() - self.lastPaint >= 1.0/self.fps
+
+    def moveTo(self,row,out):
+        if row < self.cursor:
+            out.append('\033[%dA' % (self.cursor-row))
+        elif row > self.cursor:
+            #rows past the last one painted don't exist yet
+            existing = max(min(row,len(self.painted)-1)-self.cursor,0)
+            if existing:
+                out.append('\033[%dB' % existing)
+            out.append('\n'*(row-self.cursor-existing))
+        out.append('\r')
+        self.cursor = row
+        while len(self.painted) <= row:
+            self.painted.append([])
+
+    def paint(self):
+        out = []
+        for row in sorted(self.dirty):
+            new = self.rows[row]
+            old = self.painted[row] if row < len(self.painted) else []
+            first = 0
+            while first < len(new) and first < len(old) and new[first] == old[first]:
+                first += 1
+            self.moveTo(row,out)
+            if first:
+                out.append('\033[%dC' % first)
+            #runs of cells the same color are colored together
+            run, color = [], None
+            for char, c in new[first:]+[(None,None)]:
+                if c != color or char is None:
+                    if run:
+                        out.append(self.colorize(''.join(run),color) if color else ''.join(run))
+                    run, color = [], c
+                if char is not None:
+                    run.append(char)
+            if len(old) > len(new):
+                out.append('\033[K')
+            self.painted[row] = list(new)
+        self.dirty.clear()
+        if out:
+            self.stream.write(''.join(out))
+            self.stream.flush()
+        self.lastPaint = timer()
+
+    def finish(self,row,col):
+        """ paint the last frame, and leave the cursor at row, col """
+        self.paint()
+        out = []
+        self.moveTo(row,out)
+        if col:
+            out.append('\033[%dC' % col)
+        self.stream.write(''.join(out))
+
+
+def eta(seconds):
+    """ a time left, for people """
+    seconds = int(seconds+0.5)
+    if seconds < 60:
+        return '%ds' % seconds
+    if seconds < 3600:
+        return '%d:%02d' % (seconds//60,seconds%60)
+    return '%d:%02d:%02d' % (seconds//3600,seconds//60%60,seconds%60)
+
+
+class LiveCounts(object):
+    """ Mixin for reporters drawing with a Renderer: a status line of how
+        many tests passed, failed and were skipped, and how long the rest
+        should take at the rate they've been going.
+        draw() puts the frame in the renderer's model. It's only called when
+        a frame is due, so tests in between cost next to nothing
+    """
+    def startCounting(self):
+        self.done = 0
+        self.runStart = timer()
+
+    def refresh(self,force=False):
+        if force or self.renderer.due():
+            self.draw()
+            self.renderer.paint()
+
+    def status(self):
+        failed = len(self.failures) + len(self.errors)
+        parts = [('%d passing' % len(self.successes),'green')]
+        if failed:
+            parts.append(('  %d failing' % failed,'red'))
+        if self.skipped:
+            parts.append(('  %d pending' % len(self.skipped),'blue'))
+        left = self.testCount - self.done
+        if self.done and left > 0:
+            parts.append(('  ETA %s' % eta((timer()-self.runStart)/self.done*left),'lightblack'))
+        return parts
 
 
 class Spec(Result):
     def startTestRun(self):
         super(Spec,self).startTestRun()
-        self.tests_seen = {}
+        self.modules_seen = set()
+        self.classes_seen = set()
 
     def startTest(self,test):
         super(Spec,self).startTest(test)
-        test_path = test.id().split('.')
-        if test_path[-3] not in self.tests_seen:
-            self.write("  %s\n"%test_path[-3],'white')
-            self.tests_seen[test_path[-3]] = []
-        if test_path[-2] not in self.tests_seen[test_path[-3]]:
-            self.write("    %s\n"%test_path[-2],'white')
-            self.tests_seen[test_path[-3]].append(test_path[-2])
+        info = self.info(test)
+        if info.module not in self.modules_seen:
+            self.write("  %s\n"%info.module,'white')
+            self.modules_seen.add(info.module)
+        if (info.module,info.cls) not in self.classes_seen:
+            self.write("    %s\n"%info.cls,'white')
+            self.classes_seen.add((info.module,info.cls))
 
     def addSuccess(self,test):
         super(Spec,self).addSuccess(test)
         self.write("      %s"%self.icon['check'],'green')
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
-        self.write(" %s\n"%desc,'lightblack')
+        self.write(" %s"%self.info(test).name,'lightblack')
+        self.writeDuration(test)
+        self.write("\n")
 
     def addSkip(self,test,reason):
         super(Spec,self).addSkip(test,reason)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
-        self.write("      - %s (%s)\n"%(desc,reason),'blue')
+        self.write("      - %s (%s)\n"%(self.info(test).name,reason),'blue')
 
     def addError(self,test,err):
         super(Spec,self).addError(test,err)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
-        self.write("      %d) %s\n"%(test.failNum,desc),'magenta')
+        self.write("      %d) %s\n"%(self.record(test).failNum,self.info(test).name),'magenta')
 
     def addFailure(self,test,err):
         super(Spec,self).addFailure(test,err)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
-        self.write("      %d) %s\n"%(test.failNum,desc),'red')
+        self.write("      %d) %s\n"%(self.record(test).failNum,self.info(test).name),'red')
 
 
 class TAP(Result):
@@ -279,6 +1192,8 @@ class TAP(Result):
         super(TAP,self).startTestRun()
         self.testCounter=1
         self.write('1..%d\n'%self.testCount)
+        if self.unaffected:
+            self.write('# %d tests unaffected by changes, not run\n'%self.unaffected)
 
     def stopTest(self,test):
         super(TAP,self).stopTest(test)
@@ -289,60 +1204,56 @@ class TAP(Result):
 
     def addSuccess(self,test):
         super(TAP,self).addSuccess(test)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
-        self.write('ok %d - %s %s\n' % (
+        info = self.info(test)
+        self.write('ok %d - %s %s' % (
             self.testCounter,
-            test.id().split('.')[-2],
-            desc
+            info.cls,
+            info.name
         ))
+        duration = self.record(test).duration
+        if self.speed(duration) == 'slow':
+            self.write(' # time=%dms' % (duration*1000))
+        self.write('\n')
     def addSkip(self,test,reason):
         super(TAP,self).addSkip(test,reason)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
+        info = self.info(test)
         self.write('ok %d - %s %s # SKIP %s\n' % (
             self.testCounter,
-            test.id().split('.')[-2],
-            desc,
+            info.cls,
+            info.name,
             reason
         ))
     def addError(self,test,err):
         super(TAP,self).addError(test,err)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
+        info = self.info(test)
         self.write('not ok %d - %s %s\n' % (
             self.testCounter,
-            test.id().split('.')[-2],
-            desc
+            info.cls,
+            info.name
         ))        
     def addFailure(self,test,err):
         super(TAP,self).addFailure(test,err)
-        desc = test.shortDescription()
-        if desc is None:
-            desc = test.id().split('.')[-1]
+        info = self.info(test)
         self.write('not ok %d - %s %s\n' % (
             self.testCounter,
-            test.id().split('.')[-2],
-            desc
+            info.cls,
+            info.name
         ))    
 
 
 class List(Result):
     def getTestLine(self,test):
-        desc = test.shortDescription()
+        info = self.info(test)
+        desc = info.description
         if desc is None:
             desc = ''
-        try:
-            return '%s.%s %s' % (
-                test.id().split('.')[-3],
-                test.id().split('.')[-2],
-                desc
-            )
-        except Exception as e:
-            return '%s %s' % (test.id(),desc)
+        if info.module is None:
+            return '%s %s' % (info.test_id,desc)
+        return '%s.%s %s' % (
+            info.module,
+            info.cls,
+            desc
+        )
 
     def startTestRun(self):
         super(List,self).startTestRun()
@@ -351,7 +1262,9 @@ class List(Result):
     def addSuccess(self,test):
         super(List,self).addSuccess(test)
         self.write("  %s "% (self.icon['check'],),'green')
-        self.write("%s\n" % (self.getTestLine(test)),'lightblack')
+        self.write("%s" % (self.getTestLine(test)),'lightblack')
+        self.writeDuration(test)
+        self.write("\n")
 
     def addSkip(self,test,reason):
         super(List,self).addSkip(test,reason)
@@ -363,20 +1276,29 @@ class List(Result):
     def addFailure(self,test,err):
         super(List,self).addFailure(test,err)
         self.write("  %d) %s\n" % (
-            test.failNum,
+            self.record(test).failNum,
             self.getTestLine(test)
         ), 'red')
 
     def addError(self,test,err):
         super(List,self).addError(test,err)
         self.write("  %d) %s\n" % (
-            test.failNum,
+            self.record(test).failNum,
             self.getTestLine(test)
         ), 'magenta')
 
-class Progress(Result):
+class Progress(LiveCounts,Result):
     def startTestRun(self):
         super(Progress,self).startTestRun()
+        #a terminal gets a bar redrawn a few times a second, with the counts after it
+        if self.supports_color:
+            self.renderer = Renderer(self.stream,self.colorize)
+            self.progress_bars = max(min(50,self.renderer.width-60),10)
+            self.startCounting()
+            self.write('\n')
+            self.refresh(True)
+            return
+        self.renderer = None
         #self.testsDone=0
         if self.testCount < 50:
             self.progress_bars = int(round(50.0/self.testCount))*self.testCount
@@ -389,8 +1311,29 @@ class Progress(Result):
         self.right(3)
 
 
+    def draw(self):
+        filled = self.done*self.progress_bars//self.testCount if self.testCount else 0
+        self.renderer.text(0,0,[
+            ('  [',None),
+            (self.icon['dash']*filled,None),
+            (self.icon['dot']*(self.progress_bars-filled),'lightblack'),
+            ('] ',None),
+        ]+self.status())
+
+    def stopTestRun(self,starttime,stoptime):
+        if self.renderer is not None:
+            #the summary has the counts
+            self.draw()
+            self.renderer.text(0,self.progress_bars+4,[])
+            self.renderer.finish(0,self.progress_bars+4)
+        super(Progress,self).stopTestRun(starttime,stoptime)
+
     def stopTest(self,test):
         super(Progress,self).stopTest(test)
+        if self.renderer is not None:
+            self.done += 1
+            self.refresh()
+            return
         #self.testsDone += 1
         if self.testCount < self.progress_bars:
             n = int(round(self.progress_bars/self.testCount*1.0))
@@ -406,21 +1349,11 @@ class Progress(Result):
 class JSON(Result):
     def stopTestRun(self,starttime,stoptime):
         o = {
-            'stats': {
-                'tests': self.testsRun,
-                'passed': len(self.successes),
-                'errors': len(self.errors),
-                'failures': len(self.failures),
-                'skipped': len(self.skipped),
-                'successful': self.wasSuccessful(),
-                'start': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(starttime)),
-                'end': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(stoptime)),
-                'duration': stoptime-starttime
-            },
+            'stats': self.stats(starttime,stoptime),
             'passes': list(map(lambda x: self.testToJSON(x,string=False), self.successes)),
-            'failures': list(map(lambda x: self.testToJSON(x[0],error=x[1],string=False),self.failures)),
+            'failures': list(map(lambda x: self.testToJSON(x[0],error=str(x[1]),string=False),self.failures)),
             'skipped': list(map(lambda x: self.testToJSON(x[0],reason=x[1],string=False), self.skipped)),
-            'errors': list(map(lambda x: self.testToJSON(x[0],error=x[1],string=False), self.errors)),
+            'errors': list(map(lambda x: self.testToJSON(x[0],error=str(x[1]),string=False), self.errors)),
         }
         self.write(json.dumps(o)+"\n")
 
@@ -431,18 +1364,7 @@ class JSONStream(Result):
         self.write('["start",{"total": %d}]\n' % self.testCount)
 
     def stopTestRun(self,starttime,stoptime):
-        o = {
-            'tests': self.testsRun,
-            'passed': len(self.successes),
-            'errors': len(self.errors),
-            'failures': len(self.failures),
-            'skipped': len(self.skipped),
-            'successful': self.wasSuccessful(),
-            'start': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(starttime)),
-            'end': time.strftime("%a, %d %b %Y %H:%M:%S +0000",time.gmtime(stoptime)),
-            'duration': stoptime-starttime
-        }
-        self.write('["end",%s]\n'%json.dumps(o))
+        self.write('["end",%s]\n'%json.dumps(self.stats(starttime,stoptime)))
 
     def addSkip(self,test,reason):
         super(JSONStream,self).addSkip(test,reason)
@@ -460,84 +1382,2617 @@ class JSONStream(Result):
         super(JSONStream,self).addSuccess(test)
         self.write('["pass",%s]\n'%self.testToJSON(test))
 
+    def addSubTest(self,test,subtest,err):
+        super(JSONStream,self).addSubTest(test,subtest,err)
+        if err is not None:
+            record, failed = self.subTestRecord(test,subtest,err)
+            self.write('["%s",%s]\n'%('fail' if failed else 'error',self.testToJSON(record,error=err)))
+
+
+class IncrementalJSON(Result):
+    """ Same information as JSON, but each test is written out as soon as it
+        finishes and nothing is kept around, so memory use stays flat
+        however big the suite is. The stats come last:
+        {"tests": [{..., "state": "passed"}, ...], "stats": {...}}
+    """
+    keeps_outcomes=False
+
+    def startTestRun(self):
+        super(IncrementalJSON,self).startTestRun()
+        self.entries = 0
+        self.write('{"tests": [')
+
+    def stopTestRun(self,starttime,stoptime):
+        self.write('\n], "stats": %s}\n' % json.dumps(self.stats(starttime,stoptime)))
+
+    def writeEntry(self,test,state,**kwargs):
+        self.write('%s\n%s' % (
+            ',' if self.entries else '',
+            self.testToJSON(test,state=state,**kwargs)
+        ))
+        self.entries += 1
+
+    def addSuccess(self,test):
+        super(IncrementalJSON,self).addSuccess(test)
+        self.writeEntry(test,'passed')
+
+    def addSkip(self,test,reason):
+        super(IncrementalJSON,self).addSkip(test,reason)
+        self.writeEntry(test,'skipped',reason=reason)
+
+    def addFailure(self,test,err):
+        super(IncrementalJSON,self).addFailure(test,err)
+        self.writeEntry(test,'failed',error=err,trace=str(self._exc_info_to_string(err,test)))
+
+    def addError(self,test,err):
+        super(IncrementalJSON,self).addError(test,err)
+        self.writeEntry(test,'error',error=err,trace=str(self._exc_info_to_string(err,test)))
+
+    def addSubTest(self,test,subtest,err):
+        super(IncrementalJSON,self).addSubTest(test,subtest,err)
+        if err is not None:
+            #a failed subtest gets an entry of its own, as in JSON's failures and errors
+            record, failed = self.subTestRecord(test,subtest,err)
+            self.writeEntry(record,'failed' if failed else 'error',
+                            error=err,trace=str(self._exc_info_to_string(err,test)))
+
+
+class JUnit(Result):
+    """ JUnit XML, for CI systems that only read that. Each <testcase> is
+        written as soon as the test finishes and nothing is kept around.
+        The totals go in the <testsuite> tag: if the stream can seek (and
+        isn't appending), room is left for them there and filled in at the
+        end, otherwise they come last, in a comment
+    """
+    #room left in the <testsuite> tag for the totals
+    totals_width = 160
+    #characters XML 1.0 doesn't allow, even escaped
+    invalid_xml = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+    keeps_outcomes=False
+
+    def startTestRun(self):
+        super(JUnit,self).startTestRun()
+        self.cases = 0
+        self.totalsAt = None
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n<testsuite name="unitstyle"')
+        try:
+            seekable = self.stream.seekable()
+        except (AttributeError, IOError, ValueError):
+            seekable = False
+        if seekable and not self.appending():
+            self.flush()
+            self.totalsAt = self.stream.tell()
+            self.write(' '*self.totals_width)
+        #otherwise the tag goes without: fixture errors make for more test
+        #cases than there are tests, so the count isn't known up front
+        self.write('>\n')
+
+    def appending(self):
+        """ whether the stream was opened to append, so every write goes to
+            the end of the file wherever it's seeked to
+        """
+        if 'a' in str(getattr(self.stream,'mode','')):
+            return True
+        if fcntl is None:
+            return False
+        try:
+            return bool(fcntl.fcntl(self.stream.fileno(),fcntl.F_GETFL) & os.O_APPEND)
+        except (AttributeError, IOError, OSError, ValueError):
+            return False
+
+    def stopTestRun(self,starttime,stoptime):
+        self.write('</testsuite>\n</testsuites>\n')
+        stats = self.stats(starttime,stoptime)
+        totals = ' tests="%d" failures="%d" errors="%d" skipped="%d" time="%.3f" timestamp="%s"' % (
+            self.cases,
+            stats['failures'],
+            stats['errors'],
+            stats['skipped'],
+            stats['duration'],
+            time.strftime("%Y-%m-%dT%H:%M:%S",time.gmtime(starttime)),
+        )
+        if self.totalsAt is None:
+            self.write('<!--%s -->\n' % totals)
+            return
+        self.flush()
+        self.stream.seek(self.totalsAt)
+        self.stream.write(totals.ljust(self.totals_width)[:self.totals_width])
+        self.stream.seek(0,2)
+
+    def xml(self,text):
+        return escape(self.invalid_xml.sub(u'\ufffd',text))
+
+    def attr(self,text):
+        return quoteattr(self.invalid_xml.sub(u'\ufffd',text))
+
+    def writeCase(self,test,record,body=''):
+        info = self.info(test)
+        fixture = fixture_id.match(record.test_id)
+        if fixture:
+            classname, name = fixture.group(2), fixture.group(1)
+        elif info.cls is None:
+            classname, name = record.test_id, record.test_id
+        else:
+            #subtests keep their parameters in the name
+            classname = info.test_id[:-len(info.method)-1]
+            name = record.test_id[len(classname)+1:]
+        self.write('<testcase classname=%s name=%s time="%.6f"%s\n' % (
+            self.attr(classname),
+            self.attr(name),
+            record.duration or 0,
+            '>%s</testcase>' % body if body else '/>',
+        ))
+        self.cases += 1
+
+    def problem(self,tag,test,err):
+        """ the <failure> or <error> element for err """
+        summary = errorSummary(err)
+        return '<%s type=%s message=%s>%s</%s>' % (
+            tag,
+            self.attr(summary.split(':',1)[0]),
+            self.attr(summary),
+            self.xml(str(self._exc_info_to_string(err,test))),
+            tag,
+        )
+
+    def addSuccess(self,test):
+        super(JUnit,self).addSuccess(test)
+        self.writeCase(test,self.record(test))
+
+    def addSkip(self,test,reason):
+        super(JUnit,self).addSkip(test,reason)
+        self.writeCase(test,self.record(test),'<skipped message=%s/>' % self.attr(str(reason)))
+
+    def addFailure(self,test,err):
+        super(JUnit,self).addFailure(test,err)
+        self.writeCase(test,self.record(test),self.problem('failure',test,err))
+
+    def addError(self,test,err):
+        super(JUnit,self).addError(test,err)
+        self.writeCase(test,self.record(test),self.problem('error',test,err))
+
+    def addSubTest(self,test,subtest,err):
+        super(JUnit,self).addSubTest(test,subtest,err)
+        if err is not None:
+            #a failed subtest is reported as a test case of its own
+            record, failed = self.subTestRecord(test,subtest,err)
+            self.writeCase(test,record,self.problem('failure' if failed else 'error',test,err))
+
 
 class Min(Result):
     pass
 
-class Dots(Result):
+class Dots(LiveCounts,Result):
+    renderer = None
+
     def startTestRun(self):
         super(Dots,self).startTestRun()
-        self.write("\n  ")
+        self.write("\n")
+        #a terminal gets the dots wrapped to its width, redrawn a few
+        #times a second, with the counts under them
+        if self.supports_color:
+            self.renderer = Renderer(self.stream,self.colorize)
+            self.per_row = max(self.renderer.width-4,10)
+            self.startCounting()
+            #dots drawn, whether the last one is a running test's,
+            #and the row the counts were last drawn on
+            self.cells = 0
+            self.inTest = False
+            self.drawnRow = None
+        else:
+            self.write("  ")
+
+    def dot(self,color):
+        if self.renderer is None:
+            self.write(self.icon['dot'],color)
+            return
+        n = self.cells - 1
+        self.renderer.set(n//self.per_row,2+n%self.per_row,self.icon['dot'],color)
+
+    def statusRow(self):
+        return max(self.cells-1,0)//self.per_row + 2
+
+    def newDot(self,color):
+        self.cells += 1
+        if (self.cells-1) % self.per_row == 0:
+            #a new row, maybe over where the counts were
+            self.renderer.text((self.cells-1)//self.per_row,0,[])
+        self.dot(color)
+        self.refresh()
+
+    def draw(self):
+        row = self.statusRow()
+        if self.drawnRow is not None and self.drawnRow != row and self.drawnRow >= row-1:
+            self.renderer.text(self.drawnRow,0,[])
+        self.renderer.text(row,2,self.status())
+        self.drawnRow = row
 
     def startTest(self,test):
         super(Dots,self).startTest(test)
-        self.write(self.icon['dot'],'lightblack')
+        if self.renderer is not None:
+            self.inTest = True
+            self.newDot('lightblack')
+            return
+        self.dot('lightblack')
+
+    def stopTest(self,test):
+        super(Dots,self).stopTest(test)
+        if self.renderer is not None:
+            self.inTest = False
+            self.done += 1
+            self.refresh()
+
+    def stopTestRun(self,starttime,stoptime):
+        if self.renderer is not None:
+            #the summary has the counts
+            last = max(self.cells-1,0)
+            self.draw()
+            self.renderer.text(self.statusRow(),0,[])
+            self.renderer.finish(last//self.per_row,2+last%self.per_row+1)
+        super(Dots,self).stopTestRun(starttime,stoptime)
+
+    def outcome(self,color):
+        if self.renderer is None:
+            self.left()
+            self.dot(color)
+        elif self.inTest:
+            self.dot(color)
+        else:
+            #class and module fixture errors get a dot of their own
+            self.newDot(color)
 
     def addSkip(self,test,reason):
         super(Dots,self).addSkip(test,reason)
-        self.left()
-        self.write(self.icon['dot'],'blue')
+        self.outcome('blue')
 
     def addFailure(self,test,err):
         super(Dots,self).addFailure(test,err)
-        self.left()
-        self.write(self.icon['dot'],'red')
+        self.outcome('red')
 
     def addError(self,test,err):
         super(Dots,self).addError(test,err)
-        self.left()
-        self.write(self.icon['dot'],'magenta')
+        self.outcome('magenta')
 
     def addSuccess(self,test):
         super(Dots,self).addSuccess(test)
-        self.left()
-        self.stream.write(self.icon['dot'])
+        self.outcome('yellow' if self.speed(self.record(test).duration) == 'slow' else None)
+
+
+class MultiResult(Result):
+    """ Passes every test event on to several reporters, each writing to
+        its own stream. Outcomes are counted once, here, and the reporters
+        all read the same counts and records, so their outputs agree
+    """
+    def __init__(self,stream,descriptions,verbosity,count,reporters):
+        super(MultiResult,self).__init__(stream,descriptions,verbosity,count)
+        self.reporters = reporters
+        if not any(reporter.keeps_outcomes for reporter in reporters):
+            self.countOutcomes()
+        for reporter in reporters:
+            reporter.follow(self)
+
+    def startTestRun(self):
+        super(MultiResult,self).startTestRun()
+        for reporter in self.reporters:
+            reporter.startTestRun()
+
+    def stopTestRun(self,starttime,stoptime):
+        for reporter in self.reporters:
+            reporter.stopTestRun(starttime,stoptime)
+
+    def startTest(self,test):
+        super(MultiResult,self).startTest(test)
+        for reporter in self.reporters:
+            reporter.startTest(test)
+
+    def stopTest(self,test):
+        #reporters first, while the test is still the current one
+        for reporter in self.reporters:
+            reporter.stopTest(test)
+        super(MultiResult,self).stopTest(test)
+
+    def addSuccess(self,test):
+        super(MultiResult,self).addSuccess(test)
+        for reporter in self.reporters:
+            reporter.addSuccess(test)
+
+    def addSkip(self,test,reason):
+        super(MultiResult,self).addSkip(test,reason)
+        for reporter in self.reporters:
+            reporter.addSkip(test,reason)
+
+    def addFailure(self,test,err):
+        super(MultiResult,self).addFailure(test,err)
+        for reporter in self.reporters:
+            reporter.addFailure(test,err)
+
+    def addError(self,test,err):
+        super(MultiResult,self).addError(test,err)
+        for reporter in self.reporters:
+            reporter.addError(test,err)
+
+    def addSubTest(self,test,subtest,err):
+        super(MultiResult,self).addSubTest(test,subtest,err)
+        for reporter in self.reporters:
+            reporter.addSubTest(test,subtest,err)
+
+    #expected failures and unexpected successes reach the reporters
+    #through addSuccess and addFailure
+
+    def flush(self):
+        for reporter in self.reporters:
+            reporter.flush()
+
+
+
+
+class History(object):
+    """ Local sqlite database of how every test went, and how long it took,
+        in every run. Tests are keyed by test.id()
+    """
+    default_path = '.unitstyle-history'
+    #rows are written out in batches of this many
+    batch_size = 1000
+
+    def __init__(self,path=None):
+        self.path = path or self.default_path
+        self.db = sqlite3.connect(self.path,timeout=30)
+        self.db.execute('CREATE TABLE IF NOT EXISTS runs '
+                        '(id INTEGER PRIMARY KEY, start REAL, stop REAL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(run INTEGER, test TEXT, status TEXT, duration REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_test ON results (test)')
+        #source files each test ran the last time it was traced
+        self.db.execute('CREATE TABLE IF NOT EXISTS impact (test TEXT, file TEXT)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS impact_test ON impact (test)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS impact_file ON impact (file)')
+        self.run = None
+        self.pending = []
+        self.pendingFiles = []
+
+    def startRun(self,starttime):
+        self.run = self.db.execute('INSERT INTO runs (start) VALUES (?)',(starttime,)).lastrowid
+
+    def add(self,record):
+        self.pending.append((self.run,record.test_id,record.status,record.duration))
+        if len(self.pending) >= self.batch_size:
+            self.save()
+
+    def addFixtureError(self,scope):
+        """ a class's or module's fixtures errored. Its tests count as failing
+            until they next run. scope is the class or module's name, which
+            its tests' ids start with
+        """
+        self.pending.append((self.run,scope,'fixture',None))
+        if len(self.pending) >= self.batch_size:
+            self.save()
+
+    def addFiles(self,test_id,files):
+        self.pendingFiles.append((test_id,files))
+        if len(self.pendingFiles) >= self.batch_size:
+            self.save()
+
+    def save(self):
+        if self.pending:
+            self.db.executemany('INSERT INTO results VALUES (?,?,?,?)',self.pending)
+            self.pending = []
+        if self.pendingFiles:
+            self.db.executemany('DELETE FROM impact WHERE test = ?',
+                                [(test_id,) for test_id, files in self.pendingFiles])
+            #a test that ran no files still gets a row, to show it was traced
+            self.db.executemany('INSERT INTO impact VALUES (?,?)',
+                                [(test_id,f) for test_id, files in self.pendingFiles
+                                             for f in (files or [None])])
+            self.pendingFiles = []
+
+    def stopRun(self,stoptime):
+        self.save()
+        self.db.execute('UPDATE runs SET stop=? WHERE id=?',(stoptime,self.run))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def durations(self,runs=5):
+        """ {test id: average duration} over the last few runs """
+        return dict(self.db.execute(
+            'SELECT test, AVG(duration) FROM results '
+            'WHERE run > (SELECT IFNULL(MAX(id),0) FROM runs WHERE stop IS NOT NULL) - ? '
+            'AND duration IS NOT NULL GROUP BY test',(runs,)))
+
+    def history(self,test_id):
+        """ [(run start time, status, duration)] for one test, oldest first """
+        return list(self.db.execute(
+            'SELECT runs.start, status, duration FROM results '
+            'JOIN runs ON results.run = runs.id WHERE test = ? ORDER BY run',(test_id,)))
+
+    def failing(self):
+        """ ids of the tests that failed or errored the last time they ran,
+            and the names of classes and modules whose fixtures errored
+            since their tests last ran
+        """
+        failing = set(row[0] for row in self.db.execute(
+            'SELECT test FROM results latest '
+            'WHERE status IN (\'failed\',\'error\') '
+            'AND run = (SELECT MAX(run) FROM results WHERE test = latest.test)'))
+        #ids between 'scope.' and 'scope/' are the ones starting with 'scope.'
+        failing.update(row[0] for row in self.db.execute(
+            'SELECT DISTINCT test FROM results fixture WHERE status = \'fixture\' '
+            'AND NOT EXISTS (SELECT 1 FROM results later WHERE later.run > fixture.run '
+            'AND later.test > fixture.test || \'.\' AND later.test < fixture.test || \'/\')'))
+        return failing
+
+    def traced(self):
+        """ ids of the tests with recorded source files """
+        return set(row[0] for row in self.db.execute('SELECT DISTINCT test FROM impact'))
+
+    def affected(self,files):
+        """ ids of the tests that ran any of files (paths relative to where
+            the tests were traced from) the last time they were traced
+        """
+        tests = set()
+        files = list(files)
+        #keep under sqlite's limit on query parameters
+        for i in range(0,len(files),500):
+            chunk = files[i:i+500]
+            tests.update(row[0] for row in self.db.execute(
+                'SELECT DISTINCT test FROM impact WHERE file IN (%s)' % ','.join('?'*len(chunk)),
+                chunk))
+        return tests
+
+    def slower(self,factor=2.0,runs=5):
+        """ [(test id, latest duration, previous average)] for tests that took
+            over factor times longer in the latest run than in the runs before
+        """
+        latest = self.db.execute(
+            'SELECT IFNULL(MAX(id),0) FROM runs WHERE stop IS NOT NULL').fetchone()[0]
+        return list(self.db.execute(
+            'SELECT now.test, now.duration, AVG(before.duration) FROM results now '
+            'JOIN results before ON before.test = now.test '
+            'WHERE now.run = ? AND before.run < ? AND before.run >= ? '
+            'GROUP BY now.test, now.duration '
+            'HAVING now.duration > ? * AVG(before.duration) '
+            'ORDER BY now.duration DESC',(latest,latest,latest-runs,factor)))
+
+
+class EventLog(object):
+    """ Append-only binary log of the test events a Result saw, so the run
+        can be reported again later in any format without rerunning it
+        (see TestRunner.replay). Each run starts with a
+        ('run', test count, start time, unaffected) entry and ends with
+        ('end', stop time). In between are events, the same as
+        EventRecorder's, and ('describe', test id, description) entries
+        for tests with a description
+    """
+    default_path = '.unitstyle-events'
+
+    def __init__(self,path=None):
+        self.path = path or self.default_path
+        self.file = None
 
+    def startRun(self,count,starttime,unaffected=0):
+        self.file = open(self.path,'ab')
+        self.add(('run',count,starttime,unaffected))
 
+    def add(self,entry):
+        pickle.dump(entry,self.file,2)
+
+    def stopRun(self,stoptime):
+        self.add(('end',stoptime))
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read(self,run=-1):
+        """ (test count, start time, stop time, unaffected, entries) of one
+            logged run, the last one by default. Runs that didn't finish
+            have their start time as their stop time
+        """
+        #only hold on to the runs that might be the one wanted
+        runs = collections.deque(maxlen=-run if run < 0 else 1)
+        seen = 0
+        current = None
+        with open(self.path,'rb') as f:
+            unpickler = LogUnpickler(f)
+            while True:
+                try:
+                    entry = unpickler.load()
+                except EOFError:
+                    break
+                if entry[0] == 'run':
+                    current = None
+                    if run < 0 or seen == run:
+                        current = [entry[1],entry[2],entry[2],entry[3],[]]
+                        runs.append(current)
+                    seen += 1
+                elif current is None:
+                    continue
+                elif entry[0] == 'end':
+                    current[2] = entry[1]
+                else:
+                    current[4].append(entry)
+        if not runs or (run < 0 and len(runs) < runs.maxlen):
+            raise ValueError("no run %d in %s" % (run,self.path))
+        return tuple(runs[0])
+
+
+class LogUnpickler(pickle.Unpickler):
+    """ only unpickles the classes an EventLog can hold, so reading a log
+        can't run arbitrary code
+    """
+    def find_class(self,module,name):
+        if name in ('RemoteError','TestRecord'):
+            return globals()[name]
+        if (module,name) in (('builtins','set'),('__builtin__','set')):
+            return set #files seen by a FileTracer
+        raise pickle.UnpicklingError("%s.%s is not allowed in an event log" % (module,name))
+
+
+class EventRecorder(unittest.TestResult):
+    """ Result used inside worker processes. Rather than printing anything,
+        it records every test event so the parent process can replay them
+        into the real reporter
+    """
+    def __init__(self,stream=None,descriptions=None,verbosity=None):
+        super(EventRecorder,self).__init__(stream,descriptions,verbosity)
+        self.events = []
+        self.trace_depth = None
+        self.tracer = None
+        self.profiler = None
+        self.tracker = None
+        self.testStart = timer()
+
+    def record(self,name,test,*args):
+        #each event is (hook name, test id, seconds into the test, hook args...)
+        self.events.append((name,test.id(),timer()-self.testStart)+args)
+
+    def addDuration(self,test,elapsed):
+        #the events have the timings. See Result.addDuration
+        pass
+
+    def startTest(self,test):
+        super(EventRecorder,self).startTest(test)
+        self.testStart = timer()
+        self.record('startTest',test)
+        if self.tracer is not None:
+            self.tracer.start()
+        if self.tracker is not None:
+            self.tracker.start(test)
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def stopWatching(self,test):
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+            if timer() - self.testStart >= self.profiler.threshold:
+                self.record('profiled',test,self.profiler.hotspots())
+        if self.tracker is not None and self.tracker.running:
+            self.record('measured',test,self.tracker.stop())
+
+    def stopTest(self,test):
+        self.stopWatching(test)
+        if self.tracer is not None:
+            self.record('traceFiles',test,self.tracer.stop())
+        super(EventRecorder,self).stopTest(test)
+        self.record('stopTest',test)
+
+    def addSuccess(self,test):
+        self.stopWatching(test)
+        super(EventRecorder,self).addSuccess(test)
+        self.record('addSuccess',test)
+
+    def addFailure(self,test,err):
+        self.stopWatching(test)
+        self.record('addFailure',test,remoteError(self,err,test))
+        super(EventRecorder,self).addFailure(test,err)
+
+    def addError(self,test,err):
+        self.stopWatching(test)
+        self.record('addError',test,remoteError(self,err,test))
+        super(EventRecorder,self).addError(test,err)
+
+    def addSkip(self,test,reason):
+        self.stopWatching(test)
+        super(EventRecorder,self).addSkip(test,reason)
+        self.record('addSkip',test,reason)
+
+    def addExpectedFailure(self,test,err):
+        self.stopWatching(test)
+        self.record('addExpectedFailure',test,remoteError(self,err,test))
+        super(EventRecorder,self).addExpectedFailure(test,err)
+
+    def addUnexpectedSuccess(self,test):
+        self.stopWatching(test)
+        super(EventRecorder,self).addUnexpectedSuccess(test)
+        self.record('addUnexpectedSuccess',test)
+
+    def addSubTest(self,test,subtest,err):
+        if err is not None:
+            self.record('addSubTest',test,
+                        TestRecord(subtest.id(),subtest.shortDescription()),
+                        remoteError(self,err,subtest))
+        super(EventRecorder,self).addSubTest(test,subtest,err)
+
+
+def flattenSuite(suite,load=True,take=False):
+    """ yields each TestCase in a (possibly nested) TestSuite, in run order.
+        With load=False, modules found by discover() that haven't been
+        imported yet are passed over instead of imported.
+        With take=True, suites let go of their tests as they're yielded, as
+        they would once they'd run them, for callers running them instead
+    """
+    for index, test in enumerate(suite):
+        if isinstance(test,LazyModuleSuite) and not (load or test.loaded):
+            continue
+        if isinstance(test,unittest.TestSuite):
+            for t in flattenSuite(test,load,take):
+                yield t
+        else:
+            yield test
+        if take and getattr(suite,'_cleanup',False):
+            suite._removeTestAtIndex(index)
+
+
+def selectSuite(suite,keep):
+    """ a copy of suite with only the tests whose ids pass keep(test_id).
+        Modules found by discover() are narrowed down without importing them.
+        Returns the new suite and how many tests were left out
+    """
+    selected = unittest.TestSuite()
+    left_out = 0
+    for test in suite:
+        if isinstance(test,LazyModuleSuite) and not test.loaded:
+            part = test.select(keep)
+            left_out += test.countTestCases() - part.countTestCases()
+            if part.countTestCases():
+                selected.addTest(part)
+        elif isinstance(test,unittest.TestSuite):
+            part, n = selectSuite(test,keep)
+            left_out += n
+            if part.countTestCases():
+                selected.addTest(part)
+        elif keep(test.id()):
+            selected.addTest(test)
+        else:
+            left_out += 1
+    return selected, left_out
+
+
+def moduleFixtures(name):
+    """ whether the module called name has setUpModule or tearDownModule """
+    module = sys.modules.get(name)
+    return hasattr(module,'setUpModule') or hasattr(module,'tearDownModule')
+
+
+def moduleBatches(batches):
+    """ merges the batches of classes from a module with setUpModule or
+        tearDownModule into the first of them, so tests sharing the module's
+        fixtures never run at the same time as each other's fixtures
+    """
+    merged = []
+    fixtured = {}
+    for batch in batches:
+        name = batch[0].__class__.__module__
+        if moduleFixtures(name):
+            if name in fixtured:
+                fixtured[name].extend(batch)
+                continue
+            fixtured[name] = batch
+        merged.append(batch)
+    return merged
+
+
+def splitSuite(suite):
+    """ splits a suite into batches of consecutive tests from the same class,
+        so class fixtures only run once per batch. The batches are what's
+        left holding the tests
+    """
+    batches = []
+    previous = None
+    for test in flattenSuite(suite,take=True):
+        if not batches or test.__class__ is not previous:
+            batches.append([])
+            previous = test.__class__
+        batches[-1].append(test)
+    return batches
+
+
+def durationTotaller(durations):
+    """ returns a function giving the total recorded duration of a list of
+        tests. Tests with no recorded duration count as average ones
+    """
+    default = sum(durations.values())/len(durations) if durations else 0.0
+    def total(tests):
+        return sum(durations.get(test.id(),default) for test in tests)
+    return total
+
+
+def longestFirst(groups,durations):
+    """ sorts groups (lists of tests) longest total duration first """
+    return sorted(groups,key=durationTotaller(durations),reverse=True)
+
+
+def rerunSuite(suite,failing,mode):
+    """ 'last-failed' keeps only the tests in failing, or in a class or module
+        in it, 'failed-first' moves them ahead of the rest. Either way, when nothing failed last time
+        the suite is left as it is.
+        Pulling tests ahead of their class means that class's fixtures can
+        run twice
+    """
+    def failed(test_id):
+        #the test, or its class's or module's fixtures
+        while True:
+            if test_id in failing:
+                return True
+            if '.' not in test_id:
+                return False
+            test_id = test_id.rsplit('.',1)[0]
+    if mode == 'last-failed':
+        selected, left_out = selectSuite(suite,failed)
+        return selected if selected.countTestCases() else suite
+    tests = list(flattenSuite(suite))
+    first = [test for test in tests if failed(test.id())]
+    if not first:
+        return suite
+    return unittest.TestSuite(first+[test for test in tests if not failed(test.id())])
+
+
+def impactSuite(suite,affected,traced):
+    """ keeps the tests in affected, and any tests never traced since
+        nothing is known about them. Returns the new suite and how many
+        tests were left out
+    """
+    return selectSuite(suite,lambda test_id: test_id in affected or test_id not in traced)
+
+
+def scheduleSuite(suite,durations):
+    """ reorders a suite to run the longest modules first, and the longest
+        classes first within each module. Classes (and modules) are kept
+        together so setUpClass and setUpModule still only run once
+    """
+    total = durationTotaller(durations)
+    modules = {} #module name: [tests of each class]
+    module_order = []
+    classes = {}
+    for test in flattenSuite(suite):
+        cls = test.__class__
+        if cls not in classes:
+            classes[cls] = []
+            if cls.__module__ not in modules:
+                modules[cls.__module__] = []
+                module_order.append(cls.__module__)
+            modules[cls.__module__].append(classes[cls])
+        classes[cls].append(test)
+
+    totals = dict((cls,total(tests)) for cls, tests in classes.items())
+    def classTotal(tests):
+        return totals[tests[0].__class__]
+    def moduleTotal(name):
+        return sum(map(classTotal,modules[name]))
+
+    ordered = unittest.TestSuite()
+    for name in sorted(module_order,key=moduleTotal,reverse=True):
+        for tests in sorted(modules[name],key=classTotal,reverse=True):
+            ordered.addTests(tests)
+    return ordered
+
+
+class LazyModuleSuite(unittest.TestSuite):
+    """ The tests of one module found by discover(), from the cache. The
+        module isn't imported until the tests are run (or iterated over)
+    """
+    def __init__(self,module,test_ids,loader=None):
+        super(LazyModuleSuite,self).__init__()
+        self.module = module
+        self.test_ids = test_ids
+        self.loader = loader or unittest.defaultTestLoader
+        self.loaded = False
+
+    def load(self):
+        if not self.loaded:
+            self.loaded = True
+            wanted = set(self.test_ids)
+            for test in flattenSuite(self.loader.loadTestsFromName(self.module)):
+                #keep tests that failed to import or load, they explain themselves
+                if test.id() in wanted or isinstance(test,getattr(unittest.loader,'_FailedTest',())):
+                    self.addTest(test)
+
+    def select(self,keep):
+        return LazyModuleSuite(self.module,[i for i in self.test_ids if keep(i)],self.loader)
+
+    def countTestCases(self):
+        if self.loaded:
+            return super(LazyModuleSuite,self).countTestCases()
+        return len(self.test_ids)
+
+    def __iter__(self):
+        self.load()
+        return super(LazyModuleSuite,self).__iter__()
+
+    def run(self,result,debug=False):
+        self.load()
+        return super(LazyModuleSuite,self).run(result,debug)
+
+
+class DiscoveryCache(object):
+    """ test ids found in each test file, keyed by the file's path,
+        modification time and size. Kept as JSON
+    """
+    default_path = '.unitstyle-discovery'
+
+    def __init__(self,path=None):
+        self.path = path or self.default_path
+        try:
+            with open(self.path) as f:
+                self.files = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.files = {}
+        self.changed = False
+
+    def get(self,path,module):
+        """ the cached test ids for path, or None if it has changed since """
+        entry = self.files.get(path)
+        st = os.stat(path)
+        if (entry is None or entry['mtime'] != st.st_mtime or
+                entry['size'] != st.st_size or entry['module'] != module):
+            return None
+        return entry['tests']
+
+    def put(self,path,module,test_ids):
+        st = os.stat(path)
+        self.files[path] = {
+            'mtime': st.st_mtime,
+            'size': st.st_size,
+            'module': module,
+            'tests': test_ids,
+        }
+        self.changed = True
+
+    def save(self):
+        if self.changed:
+            with open(self.path,'w') as f:
+                json.dump(self.files,f)
+            self.changed = False
+
+
+def findTestFiles(start_dir,pattern):
+    """ test files under start_dir, in the order unittest's discovery finds
+        them. Like unittest, only directories that are packages are searched
+    """
+    for name in sorted(os.listdir(start_dir)):
+        path = os.path.join(start_dir,name)
+        if os.path.isdir(path):
+            if os.path.isfile(os.path.join(path,'__init__.py')):
+                for found in findTestFiles(path,pattern):
+                    yield found
+        elif (name.endswith('.py') and fnmatch.fnmatch(name,pattern) and
+                name[:-3].replace('_','a').isalnum()):
+            yield path
+
+
+def discover(start_dir='.',pattern='test*.py',top_level_dir=None,cache=None,loader=None):
+    """ Like unittest.TestLoader().discover(), but remembers which tests
+        each file holds in a DiscoveryCache (at `cache`, or
+        .unitstyle-discovery). Files that haven't changed since aren't
+        imported until their tests run.
+        Only the test file itself is checked for changes, and load_tests()
+        functions in packages are not used
+    """
+    loader = loader or unittest.defaultTestLoader
+    start_dir = os.path.abspath(start_dir)
+    top_level_dir = os.path.abspath(top_level_dir or start_dir)
+    if top_level_dir not in sys.path:
+        sys.path.insert(0,top_level_dir)
+
+    cache = DiscoveryCache(cache)
+    suite = unittest.TestSuite()
+    for path in findTestFiles(start_dir,pattern):
+        module = os.path.relpath(path,top_level_dir)[:-3].replace(os.sep,'.')
+        test_ids = cache.get(path,module)
+        if test_ids is not None:
+            suite.addTest(LazyModuleSuite(module,test_ids,loader))
+            continue
+        tests = loader.loadTestsFromName(module)
+        found = list(flattenSuite(tests))
+        #import errors show up as a failed test. Don't remember those
+        if not any(isinstance(t,getattr(unittest.loader,'_FailedTest',())) for t in found):
+            cache.put(path,module,[t.id() for t in found])
+        suite.addTest(tests)
+    cache.save()
+    return suite
+
+
+#inotify event flags
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+
+
+class FileWatcher(object):
+    """ Waits for python files under some directories to change. Uses
+        inotify on linux, and elsewhere (or when the kernel won't watch
+        any more directories) compares modification times every
+        `interval` seconds. Hidden directories and __pycache__ are left out
+    """
+    #after a change, how long to wait for more, e.g. the rest of an editor's save
+    settle = 0.05
+    mask = IN_ATTRIB|IN_CLOSE_WRITE|IN_MOVED_FROM|IN_MOVED_TO|IN_CREATE|IN_DELETE
+
+    def __init__(self,paths,interval=0.5):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.interval = interval
+        self.fd = None
+        self.watches = {} #inotify watch descriptor: directory
+        if ctypes is not None and sys.platform.startswith('linux'):
+            try:
+                self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',use_errno=True)
+                self.fd = self.libc.inotify_init1(getattr(os,'O_CLOEXEC',0))
+            except (OSError, AttributeError):
+                self.fd = None
+            if self.fd is not None and self.fd < 0:
+                self.fd = None
+        for path in self.paths:
+            self.watchTree(path)
+        if self.fd is None:
+            self.snapshot = self.scan()
+
+    def directories(self,root):
+        for path, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+            yield path, files
+
+    def pythonFiles(self,root):
+        for path, files in self.directories(root):
+            for name in files:
+                if name.endswith('.py'):
+                    yield os.path.join(path,name)
+
+    def watchTree(self,root):
+        if self.fd is None:
+            return
+        for path, files in self.directories(root):
+            wd = self.libc.inotify_add_watch(self.fd,path.encode(sys.getfilesystemencoding()),self.mask)
+            if wd < 0:
+                #usually out of watches, fs.inotify.max_user_watches
+                os.close(self.fd)
+                self.fd = None
+                self.snapshot = self.scan()
+                return
+            self.watches[wd] = path
+
+    def scan(self):
+        """ {path: (modification time, size)} of every python file """
+        snapshot = {}
+        for root in self.paths:
+            for path in self.pythonFiles(root):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue #deleted since
+                snapshot[path] = (st.st_mtime,st.st_size)
+        return snapshot
+
+    def poll(self,timeout=None):
+        """ paths of the python files that changed, were added or were
+            removed, waiting up to timeout seconds (forever for None) for
+            a change. Might be empty
+        """
+        if self.fd is None:
+            time.sleep(self.interval if timeout is None else timeout)
+            snapshot = self.scan()
+            changed = set(path for path in set(snapshot)|set(self.snapshot)
+                          if snapshot.get(path) != self.snapshot.get(path))
+            self.snapshot = snapshot
+            return changed
+        if not select.select([self.fd],[],[],timeout)[0]:
+            return set()
+        data = os.read(self.fd,65536)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = struct.unpack_from('iIII',data,offset)
+            name = data[offset+16:offset+16+length].rstrip(b'\0').decode(sys.getfilesystemencoding())
+            offset += 16+length
+            if mask & IN_Q_OVERFLOW:
+                #events were lost, anything could have changed
+                for root in self.paths:
+                    changed.update(self.pythonFiles(root))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd,None)
+                continue
+            if wd not in self.watches:
+                continue
+            path = os.path.join(self.watches[wd],name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE|IN_MOVED_TO) and not name.startswith('.') and name != '__pycache__':
+                    self.watchTree(path)
+                    changed.update(self.pythonFiles(path))
+            elif name.endswith('.py'):
+                changed.add(path)
+        return changed
+
+    def wait(self):
+        """ blocks until python files change, and returns their paths """
+        changed = set()
+        while not changed:
+            changed = self.poll()
+        while True:
+            more = self.poll(self.settle)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def moduleImports(name,path,package):
+    """ names of the modules the source at path could import, wherever
+        in it the imports are. package is the module's __package__
+    """
+    with open(path,'rb') as f:
+        tree = ast.parse(f.read(),path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node,ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node,ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parts = (package or '').split('.')
+                parent = '.'.join(parts[:len(parts)-node.level+1])
+                base = parent + '.' + base if base else parent
+            names.add(base)
+            #from package import module
+            names.update(base + '.' + alias.name for alias in node.names)
+    names.discard(name)
+    return names
+
+
+def failedImport(name):
+    """ a test that errors with why module name just failed to import """
+    failed = unittest.loader._make_failed_import_test(name,unittest.TestSuite)
+    #a (suite, message) pair since python 3.5
+    return failed[0] if isinstance(failed,tuple) else failed
+
+
+class Reloader(object):
+    """ Reloads the modules of changed files, and the modules importing
+        those (directly or not), each after the ones it imports. Only
+        modules from under roots are reloaded, never unitstyle itself or
+        __main__. What each module imports is read from its source
+    """
+    def __init__(self,roots):
+        self.roots = [os.path.join(os.path.realpath(root),'') for root in roots]
+        self.imports = {} #path: (modification time, module names it imports)
+        #modules whose last reload failed are tried again after every change
+        self.failed = set()
+
+    def modules(self):
+        """ {source path: module name} of the loaded modules under roots """
+        own = set([__name__,__name__.rpartition('.')[0],'__main__'])
+        modules = {}
+        for name, module in list(sys.modules.items()):
+            path = getattr(module,'__file__',None)
+            if module is None or not path or name in own:
+                continue
+            if path.endswith(('.pyc','.pyo')):
+                path = path[:-1]
+            path = os.path.realpath(path)
+            if path.endswith('.py') and any(path.startswith(root) for root in self.roots):
+                modules[path] = name
+        return modules
+
+    def importsOf(self,name,path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return set()
+        cached = self.imports.get(path)
+        if cached is None or cached[0] != mtime:
+            module = sys.modules[name]
+            package = getattr(module,'__package__',None)
+            if package is None:
+                package = name if path.endswith('__init__.py') else name.rpartition('.')[0]
+            try:
+                cached = self.imports[path] = (mtime,moduleImports(name,path,package))
+            except (SyntaxError, ValueError):
+                cached = (mtime,set()) #reloading it will say what's wrong
+        return cached[1]
+
+    def reload(self,paths):
+        """ reloads what changed with the files at paths. Returns the names
+            of the modules reloaded, in order, and failed-import tests for
+            the modules that couldn't be. Modules importing those aren't
+            reloaded, they'd only fail the same way
+        """
+        modules = self.modules()
+        names = set(modules.values())
+        imports = dict((name,self.importsOf(name,path) & names) for path, name in modules.items())
+        importers = collections.defaultdict(set)
+        for name, imported in imports.items():
+            for other in imported:
+                importers[other].add(name)
+
+        changed = set(modules[p] for p in map(os.path.realpath,paths) if p in modules)
+        changed |= self.failed & names
+        #the modules of deleted files are forgotten, what imports them will fail to reload
+        gone = set(name for path, name in modules.items() if not os.path.exists(path))
+        for name in gone:
+            del sys.modules[name]
+        affected = set()
+        pending = list(changed)
+        while pending:
+            name = pending.pop()
+            if name not in affected:
+                affected.add(name)
+                pending.extend(importers[name])
+
+        ordered = []
+        def visit(name,seen):
+            if name in seen:
+                return
+            seen.add(name)
+            for other in sorted(imports[name]):
+                if other in affected:
+                    visit(other,seen)
+            ordered.append(name)
+        seen = set()
+        for name in sorted(affected):
+            visit(name,seen)
+
+        reloaded, failures, broken = [], [], set()
+        self.failed = set()
+        for name in ordered:
+            if name in gone:
+                continue
+            if imports[name] & broken:
+                broken.add(name)
+                continue
+            try:
+                reload(sys.modules[name])
+            except Exception:
+                failures.append(failedImport(name))
+                broken.add(name)
+                self.failed.add(name)
+            else:
+                reloaded.append(name)
+        return reloaded, failures
+
+
+def shardCount(path):
+    """ how many tests a JSON, JSONStream or json-incremental output
+        says it holds, reading as little of it as possible
+    """
+    with open(path) as f:
+        first = f.readline()
+        if first.startswith('["start",'):
+            return json.loads(first)[1]['total']
+        match = re.match(r'\{"stats": \{"tests": (\d+)',first)
+        if match:
+            return int(match.group(1))
+        if first.startswith('{"tests": ['):
+            #the stats are on the last line
+            f.seek(0,2)
+            f.seek(max(0,f.tell()-65536))
+            last = f.read().rstrip().rsplit('\n',1)[-1]
+            if last.startswith('], "stats": '):
+                return json.loads(last[len('], "stats": '):-1])['tests']
+            return 0
+        return json.loads(first+f.read())['stats']['tests']
+
+
+def shardEntries(path):
+    """ the tests in a JSON, JSONStream or json-incremental output, as
+        EventLog entries. Each file's stats come as a ('stats', stats) entry
+    """
+    with open(path) as f:
+        first = f.readline()
+        if first.startswith('["start",'):
+            for line in f:
+                kind, o = json.loads(line)
+                if kind == 'end':
+                    yield ('stats',o)
+                else:
+                    for entry in jsonTestEntries(o,kind):
+                        yield entry
+        elif first.startswith('{"tests": ['):
+            for line in f:
+                if line.startswith('], "stats": '):
+                    yield ('stats',json.loads(line[len('], "stats": '):].rstrip()[:-1]))
+                    continue
+                line = line.strip().rstrip(',')
+                if not line:
+                    continue
+                o = json.loads(line)
+                for entry in jsonTestEntries(o,o['state']):
+                    yield entry
+        else:
+            o = json.loads(first+f.read())
+            yield ('stats',o['stats'])
+            #JSON output only groups tests by outcome, not in run order
+            for kind, key in (('pass','passes'),('fail','failures'),('skip','skipped'),('error','errors')):
+                for test in o[key]:
+                    for entry in jsonTestEntries(test,kind):
+                        yield entry
+
+
+def jsonTestEntries(o,kind):
+    """ EventLog entries for one test as JSON output describes it """
+    test_id = o['test']
+    duration = o.get('duration') or 0.0
+    subtest = subtest_id.match(test_id)
+    if subtest and kind not in ('pass','passed','skip','skipped'):
+        #a failed subtest, reported as part of its test
+        yield ('addSubTest',subtest.group(1),duration,
+               TestRecord(test_id,o.get('description')),jsonError(o,kind))
+        return
+    #errors in class and module fixtures never start or stop
+    fixture = fixture_id.match(test_id)
+    if o.get('description') is not None:
+        yield ('describe',test_id,o['description'])
+    if not fixture:
+        yield ('startTest',test_id,0.0)
+    if o.get('hotspots'):
+        yield ('profiled',test_id,duration,o['hotspots'])
+    if o.get('memory') is not None:
+        yield ('measured',test_id,duration,o['memory'])
+    if kind in ('pass','passed'):
+        yield ('addSuccess',test_id,duration)
+    elif kind in ('skip','skipped'):
+        yield ('addSkip',test_id,duration,o.get('reason'))
+    else:
+        error = jsonError(o,kind)
+        yield ('addFailure' if error.failure else 'addError',test_id,duration,error)
+    if not fixture:
+        yield ('stopTest',test_id,duration)
+
+
+def jsonError(o,kind):
+    """ a RemoteError for a failure or error as JSON output describes it """
+    #JSON output has the whole trace as the error, the others a summary
+    error = (o.get('error') or '').strip()
+    summary = error.rsplit('\n',1)[-1]
+    trace = o.get('trace') or error+'\n'
+    name, _, message = summary.partition(': ')
+    return RemoteError(name,message,trace,kind in ('fail','failed'))
+
+
+def outcomeCounts(result):
+    """ how many tests result has run, and how many had each outcome """
+    return {
+        'tests': result.testsRun,
+        'passed': len(result.successes),
+        'failures': len(result.failures),
+        'errors': len(result.errors),
+        'skipped': len(result.skipped),
+    }
+
+
+def jsonTime(stamp):
+    """ seconds since the epoch, from the times in JSON output's stats """
+    return calendar.timegm(time.strptime(stamp,"%a, %d %b %Y %H:%M:%S +0000"))
+
+
+#set in each worker process by _initWorker
+_worker_batches = None
+_worker_options = {}
+
+def _initWorker(batches,options):
+    global _worker_batches, _worker_options
+    #let the parent decide what ctrl-C means
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+    _worker_batches = batches
+    _worker_options = options
+
+def _runBatch(batch):
+    """ runs the batch at an index of the batches forked along with this
+        worker, or, in a fork server's worker, the tests with a list of ids,
+        loaded from the modules it imported
+    """
+    recorder = setupRecorder(EventRecorder(),_worker_options)
+    if isinstance(batch,int):
+        batch = _worker_batches[batch]
+    else:
+        batch = list(loadIds(batch))
+    unittest.TestSuite(batch)(recorder)
+    return recorder.events
+
+def loadIds(ids,loader=unittest.defaultTestLoader):
+    """ yields the tests with these ids, like loader.loadTestsFromNames but
+        looking each class up once. Names taken for modules are tried as
+        imports one by one, which is slow for thousands of them. Ids that
+        aren't a method of a TestCase class are left to the loader
+    """
+    classes = {}
+    for test_id in ids:
+        name, _, method = test_id.rpartition('.')
+        if name not in classes:
+            module, _, attr = name.rpartition('.')
+            try:
+                found = getattr(__import__(module,fromlist=['_']),attr,None)
+            except (ImportError, ValueError):
+                found = None
+            if not (isinstance(found,type) and issubclass(found,unittest.TestCase)):
+                found = None
+            classes[name] = found
+        cls = classes[name]
+        if cls is not None and hasattr(cls,method):
+            yield cls(method)
+        else:
+            for test in flattenSuite(loader.loadTestsFromName(test_id)):
+                yield test
+
+def importPath():
+    """ sys.path as a PYTHONPATH, for processes that have to import
+        things from the same places as this one
+    """
+    return os.pathsep.join([os.path.abspath(p) if p else os.getcwd() for p in sys.path])
+
+def hideMain():
+    """ Keeps multiprocessing from running the script that started the run
+        again in each worker it doesn't fork from this process, which it
+        does so functions defined there can be unpickled. Workers only need
+        unitstyle and the test modules. Returns a function to undo it
+    """
+    main = sys.modules['__main__']
+    path, spec = getattr(main,'__file__',None), getattr(main,'__spec__',None)
+    if path is not None:
+        del main.__file__
+    main.__spec__ = None
+    def restore():
+        if path is not None:
+            main.__file__ = path
+        main.__spec__ = spec
+    return restore
+
+_server_python = None
+
+def serverPython():
+    """ A script to start a fork server with in place of this interpreter.
+        It runs this interpreter with the flags and command it's given, and
+        sets this process's sys.path first, which the server is handed but
+        doesn't use, so it can find the modules to import. Written once, and
+        removed when this process exits
+    """
+    global _server_python
+    if _server_python is None:
+        fd, _server_python = tempfile.mkstemp(prefix='unitstyle-server-',suffix='.py')
+        with os.fdopen(fd,'w') as f:
+            f.write('#!%s\n' % sys.executable)
+            f.write('import os, sys\n')
+            f.write('command = sys.argv.index("-c")\n')
+            f.write('path = %r\n' % ('import sys; sys.path[:] = %r; ' % importPath().split(os.pathsep)))
+            f.write('os.execv(sys.executable,[sys.executable] + sys.argv[1:command] + '
+                    '["-c",path + sys.argv[command+1]] + sys.argv[command+2:])\n')
+        os.chmod(_server_python,0o700)
+        atexit.register(os.remove,_server_python)
+    return _server_python
+
+def forkInstead(why):
+    """ warn that `preload` is being done without, and why """
+    warnings.warn("preload: %s, so the workers are forked from this process instead" % why,
+                  RuntimeWarning)
+
+def setupRecorder(recorder,options):
+    """ set an EventRecorder up with the options TestRunner hands its workers """
+    recorder.buffer = options.get('buffer',False)
+    recorder.trace_depth = options.get('trace_depth')
+    if options.get('impact'):
+        recorder.tracer = FileTracer(options.get('root'))
+    if options.get('profile') is not None:
+        recorder.profiler = Profiler(options.get('hotspots'),options.get('profile'))
+    if options.get('memory') is not None:
+        recorder.tracker = MemoryTracker(options.get('memory'))
+    return recorder
+
+class Channel(object):
+    """ Messages over a socket, between a TestRunner coordinating a
+        distributed run and its workers. Each message is pickled, with its
+        length in front. Like an EventLog, only plain data and unitstyle's
+        own records are unpickled
+    """
+    def __init__(self,sock):
+        self.sock = sock
+        self.buffer = b''
+        self.lock = threading.Lock()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self,message):
+        data = pickle.dumps(message,2)
+        with self.lock:
+            self.sock.sendall(struct.pack('>I',len(data))+data)
+
+    def receive(self):
+        """ reads from the socket once, and returns the messages that are now
+            complete. None once the other end has gone away
+        """
+        try:
+            chunk = self.sock.recv(65536)
+        except socket.error:
+            chunk = b''
+        if not chunk:
+            return None
+        self.buffer += chunk
+        messages = []
+        while len(self.buffer) >= 4:
+            size = struct.unpack('>I',self.buffer[:4])[0]
+            if len(self.buffer) < 4+size:
+                break
+            messages.append(LogUnpickler(io.BytesIO(self.buffer[4:4+size])).load())
+            self.buffer = self.buffer[4+size:]
+        return messages
+
+    def close(self):
+        self.sock.close()
+
+
+class StreamingRecorder(EventRecorder):
+    """ EventRecorder for distributed workers and threads: each test's events
+        are handed to send() as soon as the test is over
+    """
+    def __init__(self,send):
+        super(StreamingRecorder,self).__init__()
+        self.send = send
+        self.inTest = False
+
+    def startTest(self,test):
+        self.inTest = True
+        super(StreamingRecorder,self).startTest(test)
+
+    def stopTest(self,test):
+        super(StreamingRecorder,self).stopTest(test)
+        self.inTest = False
+
+    def record(self,name,test,*args):
+        super(StreamingRecorder,self).record(name,test,*args)
+        #fixture errors happen between tests, so go straight away
+        if name == 'stopTest' or not self.inTest:
+            self.send(self.events)
+            self.events = []
+
+
+#the thread whose output capture code running in a context belongs to,
+#for async tests' coroutines running in a SharedLoop's thread
+output_owner = contextvars.ContextVar('output_owner',default=None) if contextvars else None
+
+class ThreadOutput(object):
+    """ Stands in for sys.stdout or sys.stderr while tests run in threads, so
+        each thread can capture its own test's output. Threads that aren't
+        capturing write to the real stream
+    """
+    def __init__(self,stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def capture(self,buffer):
+        """ send this thread's output to buffer, or back to the real stream with None """
+        if buffer is None:
+            self.buffers.pop(threading.current_thread(),None)
+        else:
+            self.buffers[threading.current_thread()] = buffer
+
+    def __getattr__(self,name):
+        owner = output_owner.get() if output_owner is not None else None
+        buffer = self.buffers.get(owner or threading.current_thread())
+        return getattr(self.stream if buffer is None else buffer,name)
+
+
+class ThreadRecorder(StreamingRecorder):
+    """ StreamingRecorder for tests run in threads. With buffer, output is
+        captured through ThreadOutput stand-ins rather than by swapping
+        sys.stdout and sys.stderr, which would take other threads' output too
+    """
+    def _setupStdout(self):
+        if self.buffer:
+            if self._stderr_buffer is None:
+                self._stderr_buffer = io.StringIO()
+                self._stdout_buffer = io.StringIO()
+            self._original_stdout.capture(self._stdout_buffer)
+            self._original_stderr.capture(self._stderr_buffer)
+
+    def _restoreStdout(self):
+        if self.buffer:
+            self._original_stdout.capture(None)
+            self._original_stderr.capture(None)
+            if self._mirrorOutput:
+                for buffer, stream, line in ((self._stdout_buffer,self._original_stdout,unittest.result.STDOUT_LINE),
+                                             (self._stderr_buffer,self._original_stderr,unittest.result.STDERR_LINE)):
+                    output = buffer.getvalue()
+                    if output:
+                        stream.write(line % (output if output.endswith('\n') else output+'\n'))
+            for buffer in (self._stdout_buffer,self._stderr_buffer):
+                buffer.seek(0)
+                buffer.truncate()
+
+
+class SharedLoop(object):
+    """ Stands in for the asyncio.Runner each IsolatedAsyncioTestCase makes
+        for itself, so many of them can share one event loop, running in a
+        thread of its own. Each coroutine may take up to timeout seconds
+    """
+    def __init__(self,timeout=None):
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        #same as the loops IsolatedAsyncioTestCase makes
+        self.loop.set_debug(True)
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def get_loop(self):
+        #so sync setUp()s and such can get_event_loop() in their own thread
+        asyncio.set_event_loop(self.loop)
+        return self.loop
+
+    def run(self,coro,context=None):
+        """ runs coro on the loop, in context, and waits for it from this thread """
+        future = concurrent.futures.Future()
+        tasks = []
+        def finished(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        def start():
+            task = self.loop.create_task(coro,context=context)
+            task.add_done_callback(finished)
+            tasks.append(task)
+        self.loop.call_soon_threadsafe(start)
+        try:
+            error = future.exception(self.timeout)
+        except concurrent.futures.TimeoutError:
+            #left to be cancelled before anything else the test does next.
+            #The task may not have been made yet, but will be by then
+            def cancel():
+                for task in tasks:
+                    task.cancel()
+            self.loop.call_soon_threadsafe(cancel)
+            error = TimeoutError("%s took longer than %gs" % (coro.__qualname__,self.timeout))
+        if error is not None:
+            raise error
+        return future.result()
+
+    def close(self):
+        """ stops the loop, and cleans up what tests left on it like asyncio.Runner would """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks,return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        finally:
+            self.loop.close()
+
+
+def asyncSharable(test):
+    """ whether test is an IsolatedAsyncioTestCase that can run on a SharedLoop """
+    cls = getattr(unittest,'IsolatedAsyncioTestCase',None)
+    #before python 3.11 the test drives a loop of its own differently
+    return cls is not None and isinstance(test,cls) and hasattr(cls,'_setupAsyncioRunner')
+
+
+def ownFixtures(cls):
+    """ whether a TestCase class has class fixtures beyond TestCase's own """
+    return any(name in vars(klass) for klass in cls.__mro__
+               if klass.__module__ not in ('unittest.case','unittest.async_case','builtins')
+               for name in ('setUpClass','tearDownClass'))
+
+
+class ConcurrentSuite(unittest.TestSuite):
+    """ Runs IsolatedAsyncioTestCase tests up to `limit` at a time, each in
+        a thread of its own with its coroutines on one shared event loop.
+        Other tests run one at a time in between, as usual.
+        Each test records its events, and they're replayed into the result
+        as the test finishes, so only this thread ever touches the result.
+        Before class and module fixtures are torn down, the tests using
+        them are waited for
+    """
+    def __init__(self,tests,limit,timeout=None,options=None):
+        super(ConcurrentSuite,self).__init__(tests)
+        self.limit = max(limit,1)
+        self.timeout = timeout
+        self.options = options or {}
+        self.done = queue.Queue()
+        self.running = 0
+        self.crashed = []
+        #for the achieved concurrency: async tests run, most at once,
+        #and the time spent with any running, weighted and not by how many
+        self.started = 0
+        self.peak = 0
+        self.busy = 0.0
+        self.active = 0.0
+        self.changed = timer()
+
+    def concurrency(self):
+        if not self.started:
+            return None
+        return {
+            'tests': self.started,
+            'peak': self.peak,
+            'average': self.busy/self.active if self.active else float(self.peak),
+        }
+
+    def count(self,change):
+        now = timer()
+        if self.running:
+            self.busy += self.running*(now-self.changed)
+            self.active += now-self.changed
+        self.changed = now
+        self.running += change
+        self.peak = max(self.peak,self.running)
+
+    def recorder(self,send):
+        return setupRecorder(ThreadRecorder(send),self.options)
+
+    def start(self,test,result,tests,loop):
+        """ start test in a thread of its own, once one of the running tests is done """
+        while self.running >= self.limit:
+            self.pump(result,tests)
+        self.started += 1
+        self.count(1)
+        def work():
+            recorder = self.recorder(lambda events: self.done.put(events))
+            #output from the test's coroutines is this thread's to capture
+            test._asyncioTestContext.run(output_owner.set,threading.current_thread())
+            #swap the test's own asyncio.Runner for the shared loop
+            test._setupAsyncioRunner = lambda: setattr(test,'_asyncioRunner',loop)
+            test._tearDownAsyncioRunner = lambda: setattr(test,'_asyncioRunner',None)
+            try:
+                test(recorder)
+            except BaseException:
+                self.crashed.append(sys.exc_info())
+            finally:
+                del test._setupAsyncioRunner, test._tearDownAsyncioRunner
+                self.done.put(None)
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+
+    def pump(self,result,tests):
+        """ replay the next test's events that come in, or count a test as done """
+        events = self.done.get()
+        if events is None:
+            self.count(-1)
+        else:
+            replayEvents(result,tests,events)
+
+    def wait(self,result,tests):
+        """ wait for every running test to finish """
+        while self.running:
+            self.pump(result,tests)
+        if self.crashed:
+            raise self.crashed[0][1]
+
+    def run(self,result):
+        tests = dict((t.id(),t) for t in self)
+        loop = SharedLoop(self.timeout)
+        result._testRunEntered = True
+        try:
+            for index, test in enumerate(self):
+                if result.shouldStop:
+                    break
+                previous = getattr(result,'_previousTestClass',None)
+                if previous is not None and test.__class__ is not previous:
+                    if ownFixtures(previous) or (previous.__module__ != test.__class__.__module__
+                                                 and moduleFixtures(previous.__module__)):
+                        self.wait(result,tests)
+                self._tearDownPreviousClass(test,result)
+                self._handleModuleFixture(test,result)
+                self._handleClassSetUp(test,result)
+                result._previousTestClass = test.__class__
+                if (getattr(test.__class__,'_classSetupFailed',False) or
+                    getattr(result,'_moduleSetUpFailed',False)):
+                    continue
+                if asyncSharable(test):
+                    self.start(test,result,tests,loop)
+                else:
+                    test(self.recorder(lambda events: replayEvents(result,tests,events)))
+                #the test is let go of once it's done and its events replayed
+                if self._cleanup:
+                    self._removeTestAtIndex(index)
+            self.wait(result,tests)
+            self._tearDownPreviousClass(None,result)
+            self._handleModuleTearDown(result)
+            result._testRunEntered = False
+        finally:
+            #anything still running after an error or ctrl-C is left to finish
+            while self.running:
+                self.pump(result,tests)
+            loop.close()
+        return result
+
+
+class PendingSuite(unittest.TestSuite):
+    """ Runs tests off the front of a queue, so tests that haven't started
+        yet can be taken off the back and handed to another worker
+    """
+    _cleanup = False
+
+    def __init__(self,tests):
+        super(PendingSuite,self).__init__()
+        self.pending = collections.deque(tests)
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.pending.popleft()
+            except IndexError:
+                return
+
+    def countTestCases(self):
+        return len(self.pending)
+
+    def steal(self):
+        """ take back half of the tests that haven't started. Tests with
+            class or module fixtures aren't taken, so those still run once
+        """
+        taken = []
+        for _ in range(len(self.pending)//2):
+            try:
+                cls = self.pending[-1].__class__
+                if ownFixtures(cls) or moduleFixtures(cls.__module__):
+                    break
+                taken.append(self.pending.pop())
+            except IndexError:
+                break
+        taken.reverse()
+        return taken
+
+
+def parseAddress(address):
+    """ (host, port) from 'host:port', or from (host, port) """
+    if isinstance(address,(list,tuple)):
+        return (address[0],int(address[1]))
+    host, _, port = address.rpartition(':')
+    return (host or '127.0.0.1',int(port))
+
+
+def stopWorkers(channels,deadline):
+    """ tell workers to stop, and wait for them to hang up until deadline
+        (a time.time()), when they're hung up on instead
+    """
+    for channel in channels:
+        try:
+            channel.send(('stop',))
+        except socket.error:
+            pass
+    for channel in channels:
+        #receive() takes a timeout as the worker hanging up
+        left = deadline - time.time()
+        while left > 0:
+            channel.sock.settimeout(left)
+            if channel.receive() is None:
+                break
+            left = deadline - time.time()
+        channel.close()
+
+
+def stopProcesses(processes,deadline):
+    """ wait for worker processes to exit until deadline, then terminate
+        them, and kill the ones that won't
+    """
+    while any(process.poll() is None for process in processes) and time.time() < deadline:
+        time.sleep(0.05)
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    deadline = time.time() + 1
+    while any(process.poll() is None for process in processes) and time.time() < deadline:
+        time.sleep(0.05)
+    for process in processes:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def work(address,loader=None):
+    """ Worker for a distributed run: connects to the TestRunner coordinating
+        it at address, and runs the tests it is handed (by id, so they must be
+        importable here) until it is told to stop
+    """
+    loader = loader or unittest.defaultTestLoader
+    channel = Channel(socket.create_connection(parseAddress(address)))
+    jobs = queue.Queue()
+    running = [None]
+    recorder = StreamingRecorder(lambda events: channel.send(('events',events)))
+
+    def listen():
+        while True:
+            messages = channel.receive()
+            if messages is None or ('stop',) in messages:
+                #the test underway is left to finish
+                recorder.stop()
+                jobs.put(None)
+                return
+            for message in messages:
+                if message[0] == 'steal':
+                    suite = running[0]
+                    channel.send(('gave',[t.id() for t in suite.steal()] if suite else []))
+                else:
+                    jobs.put(message)
+    listener = threading.Thread(target=listen)
+    listener.daemon = True
+    listener.start()
+
+    channel.send(('idle',))
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            if job[0] == 'options':
+                setupRecorder(recorder,job[1])
+                continue
+            running[0] = PendingSuite(flattenSuite(loader.loadTestsFromNames(job[1])))
+            running[0](recorder)
+            running[0] = None
+            #the batch's last class and module have been torn down, and
+            #mustn't be again when the next batch starts
+            recorder._previousTestClass = None
+            recorder._moduleSetUpFailed = False
+            channel.send(('idle',))
+    finally:
+        channel.close()
+
+
+def replayEvents(result,tests,events):
+    """ feeds events recorded by an EventRecorder (or logged by an EventLog)
+        into result. tests maps test ids to the parent process' copy of each test
+    """
+    for event in events:
+        name, test_id, elapsed, args = event[0], event[1], event[2], event[3:]
+        test = tests.get(test_id)
+        if test is None:
+            #error holders for class/module fixtures have no real test here,
+            #and logged runs have no tests at all
+            test = TestRecord(test_id)
+            #each fixture error is one of its own, even with the same id as another
+            if not fixture_id.match(test_id):
+                tests[test_id] = test
+        #wind the clock back so durations are the ones measured in the worker
+        result.testStart = timer() - elapsed
+        getattr(result,name)(test,*args)
+        if name == 'stopTest':
+            #done with the test, let it go
+            tests.pop(test_id,None)
 
 
 #custom Runner just to select custom Result
 class TestRunner(unittest.TextTestRunner):
     """ Main interface for unitstyle """
+    #seconds the workers of a distributed run get to stop once it's over,
+    #before the ones started here are terminated
+    stop_timeout=10
 
     #@todo change to **kwargs for future-proofing argument format
     def __init__(self,stream=sys.stderr,descriptions=True,verbosity=1,
-                     failfast=False,buffer=False,resultclass=None,format='dots'):
+                     failfast=False,buffer=False,resultclass=None,format='dots',
+                     workers=None,slow=Result.slow,slowest=Result.slowest,
+                     trace_depth=None,trace_length=None,history=None,
+                     schedule=None,rerun=None,impact=False,changed=None,
+                     profile=None,hotspots=5,memory=None,log=None,listen=None,
+                     threads=None,concurrency=None,timeout=None,preload=None):
         super(TestRunner,self).__init__(stream,descriptions,verbosity,failfast,buffer,resultclass)
         self.format=format
+        self.workers=workers
+        self.slow=slow
+        self.slowest=slowest
+        self.trace_depth=trace_depth
+        self.trace_length=trace_length
+        self.history=history
+        self.schedule=schedule
+        self.rerun=rerun
+        self.impact=impact
+        self.changed=changed
+        self.profile=profile
+        self.hotspots=hotspots
+        self.memory=memory
+        self.log=log
+        self.listen=listen
+        self.threads=threads
+        self.concurrency=concurrency
+        self.timeout=timeout
+        self.preload=preload
 
 
     #not super'd to control the timing and printing at the end of a test run
     def run(self,test):
+        if self.leakThreshold() is not None and self.threaded():
+            raise ValueError("memory can't be measured per test with threads, tracemalloc counts every thread's allocations")
+        if self.profileThreshold() is not None and self.threaded():
+            raise ValueError("tests can't be profiled in threads, only one profiler can run at a time")
+
+        #'longest' runs the tests that took longest in past runs first
+        durations = None
+        if self.schedule == 'longest':
+            durations = self.pastDurations()
+            test = scheduleSuite(test,durations)
+
+        #'last-failed' and 'failed-first' go by what failed last time
+        if self.rerun:
+            history = self.openHistory()
+            try:
+                test = rerunSuite(test,history.failing(),self.rerun)
+            finally:
+                history.close()
+
+        #only run tests that ran one of the changed files last time they were traced
+        unaffected = 0
+        if self.changed is not None:
+            changed = [os.path.relpath(os.path.abspath(f)) for f in self.changed]
+            history = self.openHistory()
+            try:
+                test, unaffected = impactSuite(test,history.affected(changed),history.traced())
+            finally:
+                history.close()
+
+        result, opened = self.makeResult(test.countTestCases(),unaffected)
+        #rerun modes need to know what failed for next time
+        if self.history or self.rerun or self.impact:
+            result.history = self.openHistory()
+        if self.impact and not self.elsewhere():
+            result.tracer = FileTracer()
+        if self.profileThreshold() is not None and not self.elsewhere():
+            result.profiler = Profiler(self.hotspots,self.profileThreshold())
+        if self.leakThreshold() is not None and not self.elsewhere():
+            result.tracker = MemoryTracker(self.leakThreshold())
+        if self.log:
+            result.log = EventLog(None if self.log is True else self.log)
+
+        #register with unittest signaling for ctrl-C handling in result
+        unittest.registerResult(result)
+
+        if hasattr(result,'startTestRun'):
+            result.startTestRun()
+        starttime = time.time()
+        if result.history is not None:
+            result.history.startRun(starttime)
+        if result.log is not None:
+            result.log.startRun(test.countTestCases(),starttime,unaffected)
+        try:
+            try:
+                if self.listen is not None:
+                    self.runDistributed(test,result,durations)
+                elif self.workers and self.workers > 1:
+                    self.runParallel(test,result,durations)
+                elif self.concurrency:
+                    self.runConcurrent(test,result)
+                elif self.threaded():
+                    self.runThreaded(test,result,durations)
+                else:
+                    test(result)
+            finally:
+                stoptime = time.time()
+            if hasattr(result,'stopTestRun'):
+                result.stopTestRun(starttime,stoptime)
+            if result.history is not None:
+                result.history.stopRun(stoptime)
+            if result.log is not None:
+                result.log.stopRun(stoptime)
+        finally:
+            result.flush()
+            if result.history is not None:
+                result.history.close()
+            if result.tracker is not None:
+                result.tracker.close()
+            if result.log is not None:
+                result.log.close()
+            for stream in opened:
+                stream.close()
+        return result
+
+    def replay(self,path=None,run=-1):
+        """ report a run saved by `log` again, in this runner's format(s),
+            without importing or running any tests. The last run in the log
+            by default, or the `run`th (negative to count back from the end)
+        """
+        count, starttime, stoptime, unaffected, entries = EventLog(path).read(run)
+        result, opened = self.makeResult(count,unaffected)
+        tests = {}
+        try:
+            result.startTestRun()
+            for entry in entries:
+                if entry[0] == 'describe':
+                    tests[entry[1]] = TestRecord(entry[1],entry[2])
+                else:
+                    replayEvents(result,tests,[entry])
+            result.stopTestRun(starttime,stoptime)
+        finally:
+            result.flush()
+            for stream in opened:
+                stream.close()
+        return result
+
+    def merge(self,paths):
+        """ one report, in this runner's format(s), of the JSON, JSONStream
+            and/or json-incremental outputs of several runs, e.g. shards of
+            one suite. Files are read one at a time. Failures are numbered
+            afresh, and the run is taken to span from the first shard's
+            start to the last one's end
+        """
+        result, opened = self.makeResult(sum(shardCount(path) for path in paths))
+        starttime = stoptime = None
+        unaffected = 0
+        try:
+            result.startTestRun()
+            for path in paths:
+                tests = {}
+                stats = None
+                before = outcomeCounts(result)
+                for entry in shardEntries(path):
+                    if entry[0] == 'stats':
+                        stats = entry[1]
+                        start = jsonTime(stats['start'])
+                        stop = start + stats['duration']
+                        starttime = start if starttime is None else min(starttime,start)
+                        stoptime = stop if stoptime is None else max(stoptime,stop)
+                        unaffected += stats.get('unaffected',0)
+                    elif entry[0] == 'describe':
+                        tests[entry[1]] = TestRecord(entry[1],entry[2])
+                    else:
+                        replayEvents(result,tests,[entry])
+                if stats is not None:
+                    self.checkShard(result,path,stats,before)
+            for r in [result] + getattr(result,'reporters',[]):
+                r.unaffected = unaffected
+                r.testsRun = result.testsRun
+            if starttime is None:
+                starttime = stoptime = time.time()
+            result.stopTestRun(starttime,stoptime)
+        finally:
+            result.flush()
+            for stream in opened:
+                stream.close()
+        return result
+
+    def checkShard(self,result,path,stats,before):
+        """ squares what merge() replayed from a shard with the shard's stats.
+            Tests whose subtests failed have no entry of their own, so the
+            count of tests is taken from the stats. Outcomes that don't add
+            up are reported as an error, so the merged run fails
+        """
+        counts = outcomeCounts(result)
+        result.testsRun += stats['tests'] - (counts['tests'] - before['tests'])
+        wrong = ['%s=%d (the stats say %d)' % (key,counts[key]-before[key],stats[key])
+                 for key in ('passed','failures','errors','skipped')
+                 if key in stats and stats[key] != counts[key]-before[key]]
+        if wrong:
+            message = "the tests in %s don't add up to its stats: %s" % (path,', '.join(wrong))
+            replayEvents(result,{},[('addError','merge (%s)' % path,0.0,
+                                     RemoteError('MergeError',message,'MergeError: %s\n' % message,False))])
+
+    def watch(self,start_dir='.',pattern='test*.py',top_level_dir=None,paths=None,interval=0.5):
+        """ run the tests in the test files under start_dir (found like
+            discover() finds them), then keep running them as python files
+            change, in this interpreter, until interrupted with ctrl-C.
+            The modules of changed files are reloaded along with the modules
+            importing them, and only the tests of test modules among those
+            (and of new test files) run again.
+            paths are the directories watched, top_level_dir (or start_dir)
+            by default. interval is how often to look at them where inotify
+            can't be used. Returns the last run's result
+        """
+        if self.listen is not None or self.preload:
+            raise ValueError("watch reloads modules in this process, tests can't run in a fork server or on other machines")
+        loader = unittest.defaultTestLoader
+        start_dir = os.path.abspath(start_dir)
+        top_level_dir = os.path.abspath(top_level_dir or start_dir)
+        if top_level_dir not in sys.path:
+            sys.path.insert(0,top_level_dir)
+        paths = paths or [top_level_dir]
+
+        def testModules():
+            return [os.path.relpath(path,top_level_dir)[:-3].replace(os.sep,'.')
+                    for path in findTestFiles(start_dir,pattern)]
+
+        def load(names,failures=()):
+            suite = unittest.TestSuite(failures)
+            for name in names:
+                try:
+                    __import__(name)
+                except Exception:
+                    suite.addTest(failedImport(name))
+                else:
+                    suite.addTest(loader.loadTestsFromModule(sys.modules[name]))
+            return suite
+
+        watcher = FileWatcher(paths,interval)
+        reloader = Reloader(paths)
+        result = None
+        try:
+            result = self.run(load(testModules()))
+            while True:
+                if getattr(self.stream,'isatty',lambda: False)():
+                    self.stream.write('\nWatching for changes, ctrl-C to stop\n')
+                    self.stream.flush()
+                suite = unittest.TestSuite()
+                while not suite.countTestCases():
+                    reloaded, failures = reloader.reload(watcher.wait())
+                    #test modules that failed to import are tried again every time
+                    suite = load([name for name in testModules()
+                                  if name in reloaded or name not in sys.modules],failures)
+                result = self.run(suite)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return result
+
+    def makeResult(self,count,unaffected=0):
+        """ the result to report to, and any files opened for it """
+        #several formats, each to its own stream (or file), share one run
+        formats = self.format if isinstance(self.format,(list,tuple)) else [self.format]
+        reporters = []
+        opened = []
+        for fmt in formats:
+            stream = self.stream
+            if isinstance(fmt,(list,tuple)):
+                fmt, stream = fmt
+                if not hasattr(stream,'write'):
+                    stream = open(stream,'w')
+                    opened.append(stream)
+            reporters.append(self.resultClass(fmt)(stream,self.descriptions,self.verbosity,count))
+        if len(reporters) == 1:
+            result = reporters[0]
+        else:
+            result = MultiResult(self.stream,self.descriptions,self.verbosity,count,reporters)
+
+        for r in [result] + getattr(result,'reporters',[]):
+            r.failfast=self.failfast
+            r.buffer=self.buffer
+            r.slow=self.slow
+            r.slowest=self.slowest
+            r.trace_depth=self.trace_depth
+            r.trace_length=self.trace_length
+            r.unaffected=unaffected
+        return result, opened
+
+    def resultClass(self,fmt):
+        """ the Result class for a format name """
         #somewhat unnecessary. Call parent helper method that's just there
         #for easy overriding for us, which ends up calling resultclass anyway
-        fmt = self.format.lower()
+        fmt = fmt.lower()
         if fmt == 'list': resulthandler = List
         elif fmt == 'dots': resulthandler = Dots
         elif fmt == 'jsstream': resulthandler = JSONStream
         elif fmt == 'json': resulthandler = JSON
+        elif fmt == 'json-incremental': resulthandler = IncrementalJSON
+        elif fmt == 'junit': resulthandler = JUnit
         elif fmt == 'progress': resulthandler = Progress
         elif fmt == 'min': resulthandler = Min
         elif fmt == 'tap': resulthandler = TAP
         elif fmt == 'spec': resulthandler = Spec
         else: resulthandler = Dots
-        result = resulthandler(self.stream,self.descriptions,self.verbosity,test.countTestCases())
+        return resulthandler
 
-        result.failfast=self.failfast
-        result.buffer=self.buffer
+    def profileThreshold(self):
+        """ how slow a test must be to have its hotspots kept, or None if not profiling """
+        if self.profile is None or self.profile is False:
+            return None
+        return 0 if self.profile is True else self.profile
 
-        #register with unittest signaling for ctrl-C handling in result
-        unittest.registerResult(result)
+    def leakThreshold(self):
+        """ how much memory a test may keep hold of before it's flagged, or
+            None if not measuring memory
+        """
+        if self.memory is None or self.memory is False:
+            return None
+        return MemoryTracker.threshold if self.memory is True else self.memory
 
-        if hasattr(result,'startTestRun'):
-            result.startTestRun()
-        starttime = time.time()
+    def openHistory(self):
+        return History(None if self.history in (None,True) else self.history)
+
+    def pastDurations(self):
+        """ recent test durations from the history database """
+        history = self.openHistory()
         try:
-            test(result)
+            return history.durations()
         finally:
-            stoptime = time.time()
-        if hasattr(result,'stopTestRun'):
-            result.stopTestRun(starttime,stoptime)
-        return result
-
+            history.close()
+
+    def elsewhere(self):
+        """ whether tests run in other processes or threads """
+        return self.listen is not None or bool(self.workers and self.workers > 1) or self.threaded()
+
+    def threaded(self):
+        """ whether tests run in threads (and not other processes) """
+        return (self.listen is None and not (self.workers and self.workers > 1)
+                and bool(self.concurrency or (self.threads and self.threads > 1)))
+
+    def workerOptions(self):
+        """ what worker processes need to know to record events like result would """
+        return {
+            'buffer': self.buffer,
+            'trace_depth': self.trace_depth,
+            'impact': self.impact,
+            'root': os.getcwd(),
+            'profile': self.profileThreshold(),
+            'hotspots': self.hotspots,
+            'memory': self.leakThreshold(),
+        }
 
+    def runParallel(self,test,result,durations=None):
+        """ split the suite into per-class batches and run them in a process pool.
+            Recorded events are replayed into result in suite order, so the
+            output is the same as a serial run.
+            Given past durations, the longest batches are started first.
+            Classes of a module with module fixtures all run in one batch
+        """
+        batches = moduleBatches(splitSuite(test))
+        if durations is not None:
+            batches = longestFirst(batches,durations)
+        processes = min(self.workers,len(batches)) or 1
+        context = self.forkServer(batches)
+        restoreMain, pool = lambda: None, None
+        try:
+            if context is not None:
+                #the server's workers are handed each batch's ids, and load its tests themselves
+                work = [[t.id() for t in batch] for batch in batches]
+                restoreMain = hideMain()
+                try:
+                    pool = context.Pool(processes,_initWorker,(None,self.workerOptions()))
+                except (EOFError, OSError) as e:
+                    forkInstead("the fork server didn't start workers (%s: %s)" % (e.__class__.__name__,e))
+                    restoreMain()
+                    restoreMain = lambda: None
+            if pool is None:
+                #forked workers have the batches already, and are handed indices
+                work = range(len(batches))
+                try:
+                    context = multiprocessing.get_context('fork')
+                except (AttributeError, ValueError):
+                    context = multiprocessing #python2, or no fork() on this platform
+                pool = context.Pool(processes,_initWorker,(batches,self.workerOptions()))
+            for i, events in enumerate(pool.imap(_runBatch,work)):
+                replayEvents(result,dict((t.id(),t) for t in batches[i]),events)
+                #done with the batch, let its tests go
+                batches[i] = None
+                if result.shouldStop:
+                    break
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            restoreMain()
+
+    def separateOutput(self,result):
+        """ for buffer with tests in threads: each thread captures its tests'
+            output on its own, and result mustn't swap sys.stdout and
+            sys.stderr out from under them. Returns a function to undo it
+        """
+        if not self.buffer:
+            return lambda: None
+        reporters = [result] + getattr(result,'reporters',[])
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = ThreadOutput(stdout), ThreadOutput(stderr)
+        for r in reporters:
+            r.buffer = False
+        def restore():
+            sys.stdout, sys.stderr = stdout, stderr
+            for r in reporters:
+                r.buffer = True
+        return restore
+
+    def runConcurrent(self,test,result):
+        """ run async tests `concurrency` at a time on a shared event loop
+            (see ConcurrentSuite), reporting them in the order they finish
+        """
+        if asyncio is None:
+            raise RuntimeError("concurrency needs asyncio (python 3.4+)")
+        suite = ConcurrentSuite(flattenSuite(test,take=True),self.concurrency,self.timeout,self.workerOptions())
+        restoreOutput = self.separateOutput(result)
+        try:
+            suite(result)
+        finally:
+            restoreOutput()
+        for r in [result] + getattr(result,'reporters',[]):
+            r.concurrency = suite.concurrency()
+
+    def runThreaded(self,test,result,durations=None):
+        """ run per-class batches of the suite in `threads` threads. Each
+            thread records its tests' events and queues them up for this
+            thread, the only one that touches result. Batches are reported in
+            suite order, the one at the front as its tests finish, so the
+            output is the same as a serial run.
+            Classes of a module with module fixtures all run in one batch
+        """
+        batches = moduleBatches(splitSuite(test))
+        if durations is not None:
+            batches = longestFirst(batches,durations)
+        tests = dict((t.id(),t) for batch in batches for t in batch)
+        todo = queue.Queue()
+        for index in range(len(batches)):
+            todo.put(index)
+        #(batch index, events), or (batch index, None) once it's over
+        done = queue.Queue()
+        options = self.workerOptions()
+        recorders = []
+        crashed = []
+        stopping = threading.Event()
+
+        def work():
+            while not stopping.is_set():
+                try:
+                    index = todo.get_nowait()
+                except queue.Empty:
+                    return
+                recorder = setupRecorder(ThreadRecorder(lambda events: done.put((index,events))),options)
+                recorders.append(recorder)
+                #the suite lets go of each test once it's run
+                suite = unittest.TestSuite(batches[index])
+                batches[index] = None
+                try:
+                    suite(recorder)
+                except BaseException:
+                    crashed.append(sys.exc_info())
+                finally:
+                    done.put((index,None))
+
+        restoreOutput = self.separateOutput(result)
+        threads = [threading.Thread(target=work) for _ in range(min(self.threads,len(batches)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            #events of batches behind the front one, held back until it's their turn
+            waiting = collections.defaultdict(list)
+            finished = set()
+            front = 0
+            while front < len(batches) and not crashed:
+                index, events = done.get()
+                if events is None:
+                    finished.add(index)
+                elif index == front:
+                    replayEvents(result,tests,events)
+                else:
+                    waiting[index].extend(events)
+                while front in finished:
+                    front += 1
+                    replayEvents(result,tests,waiting.pop(front,[]))
+                if result.shouldStop:
+                    break
+        finally:
+            #tests that have started are left to finish
+            stopping.set()
+            for recorder in list(recorders):
+                recorder.stop()
+            for thread in threads:
+                thread.join()
+            restoreOutput()
+        if crashed:
+            raise crashed[0][1]
+
+    def forkServer(self,batches):
+        """ with `preload`, the multiprocessing context of a fork server that
+            has imported those modules (all the suite's for True), so each
+            worker starts out with them already imported. None without
+            `preload`, or where there's no fork server (windows, python2).
+            The server outlives the run, and later runs in this process reuse it
+            as it is
+        """
+        if not self.preload:
+            return None
+        try:
+            context = multiprocessing.get_context('forkserver')
+            from multiprocessing import forkserver, spawn
+        except (AttributeError, ValueError):
+            forkInstead("there's no fork server here")
+            return None
+        if self.preload is True:
+            modules = [__name__]
+            for batch in batches:
+                name = batch[0].__class__.__module__
+                if name not in modules and name in sys.modules:
+                    modules.append(name)
+        else:
+            modules = [__name__] + list(self.preload)
+        context.set_forkserver_preload(modules)
+        #it's started by serverPython(), so it can find them where this process would.
+        #A server that fails to start is restarted without it, so check it can be run
+        script = serverPython()
+        if not os.access(script,os.X_OK):
+            forkInstead("%s can't be run, from a noexec directory say" % script)
+            return None
+        executable = spawn.get_executable()
+        context.set_executable(script)
+        try:
+            forkserver.ensure_running()
+        except OSError as e:
+            forkInstead("the fork server couldn't be started (%s)" % e)
+            return None
+        finally:
+            context.set_executable(executable)
+        return context
+
+    def runDistributed(self,test,result,durations=None):
+        """ Hand the suite out, a class at a time, to workers connecting over
+            TCP to `listen` (see work()), and replay what they send back into
+            result. With `workers`, that many are started on this machine.
+            Idle workers get the next class, and once there are none left,
+            half the unstarted tests of the worker with the most to do.
+            Classes of a module with module fixtures are handed out together,
+            and tests sharing fixtures with the rest of their batch aren't
+            taken from it. Each batch is reported once its worker is done with it
+        """
+        batches = moduleBatches(splitSuite(test))
+        if durations is not None:
+            batches = longestFirst(batches,durations)
+        tests = dict((t.id(),t) for batch in batches for t in batch)
+        position = dict((test_id,n) for n,test_id in enumerate(tests))
+        waiting = collections.deque([t.id() for t in batch] for batch in batches)
+        del batches
+
+        server = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+        server.bind(parseAddress(self.listen))
+        server.listen(64)
+        processes = self.startWorkers(server.getsockname()) if self.workers and waiting else []
+
+        #for each connected worker: the ids it has yet to run,
+        #and events of the batch it's on
+        assigned = {}
+        events = {}
+        idle = []
+        stealing = set()
+        #workers that had nothing to give, until they get their next batch
+        refused = set()
+        try:
+            while (waiting or any(assigned.values()) or any(events.values())) and not result.shouldStop:
+                readable = select.select([server]+list(assigned),[],[],1.0)[0]
+                if not readable and processes and not assigned and all(p.poll() is not None for p in processes):
+                    raise RuntimeError("all workers exited before the suite was done")
+                for channel in readable:
+                    if channel is server:
+                        channel = Channel(server.accept()[0])
+                        assigned[channel] = set()
+                        events[channel] = []
+                        channel.send(('options',self.workerOptions()))
+                        continue
+                    messages = channel.receive()
+                    if messages is None:
+                        #the worker is gone. Report what it finished, rerun the rest elsewhere
+                        replayEvents(result,tests,events.pop(channel))
+                        lost = assigned.pop(channel)
+                        if lost:
+                            waiting.appendleft(sorted(lost,key=position.get))
+                        if channel in idle:
+                            idle.remove(channel)
+                        stealing.discard(channel)
+                        refused.discard(channel)
+                        channel.close()
+                        continue
+                    for message in messages:
+                        if message[0] == 'events':
+                            events[channel].extend(message[1])
+                            for event in message[1]:
+                                if event[0] == 'stopTest':
+                                    assigned[channel].discard(event[1])
+                        elif message[0] == 'gave':
+                            stealing.discard(channel)
+                            assigned[channel].difference_update(message[1])
+                            if message[1]:
+                                waiting.appendleft(message[1])
+                            else:
+                                refused.add(channel)
+                        elif message[0] == 'idle':
+                            replayEvents(result,tests,events[channel])
+                            events[channel] = []
+                            #anything left over couldn't be loaded, and was reported as such
+                            assigned[channel].clear()
+                            idle.append(channel)
+
+                while idle and waiting:
+                    channel = idle.pop()
+                    assigned[channel].update(waiting[0])
+                    refused.discard(channel)
+                    channel.send(('run',waiting.popleft()))
+                givers = [c for c in assigned if c not in refused]
+                if idle and givers:
+                    busiest = max(givers,key=lambda c: len(assigned[c]))
+                    if len(assigned[busiest]) > 1 and busiest not in stealing:
+                        stealing.add(busiest)
+                        busiest.send(('steal',))
+        finally:
+            #workers finish the test they're on, unless it takes too long
+            deadline = time.time() + self.stop_timeout
+            stopWorkers(list(assigned),deadline)
+            #local workers still starting up are stopped as they connect
+            while any(process.poll() is None for process in processes) and time.time() < deadline:
+                if select.select([server],[],[],0.1)[0]:
+                    stopWorkers([Channel(server.accept()[0])],deadline)
+            server.close()
+            stopProcesses(processes,deadline)
+
+    def startWorkers(self,address):
+        """ start `workers` worker processes on this machine """
+        path = os.path.abspath(__file__)
+        if path.endswith(('.pyc','.pyo')):
+            path = path[:-1]
+        env = dict(os.environ)
+        #workers have to be able to import the tests the same way, from the same places
+        env['PYTHONPATH'] = importPath()
+        host = address[0] if address[0] not in ('','0.0.0.0') else '127.0.0.1'
+        return [subprocess.Popen([sys.executable,path,'worker','%s:%d' % (host,address[1])],env=env)
+                for _ in range(self.workers)]
+
+
+def main(argv=None):
+    """ command line: `python -m unitstyle replay [log]` reports a logged run
+        again, `python -m unitstyle merge files...` reports several runs'
+        JSON/JSONStream output as one, and `python -m unitstyle watch [dir]`
+        reruns the tests under dir as files change
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog='unitstyle')
+    commands = parser.add_subparsers(dest='command')
+    replay = commands.add_parser('replay',help='report a run saved by TestRunner(log=...) again')
+    replay.add_argument('log',nargs='?',default=EventLog.default_path,
+                        help='the event log (default: %(default)s)')
+    replay.add_argument('-f','--format',action='append',
+                        help='output format, or format=file to write it to a file. Can be given more than once')
+    replay.add_argument('--run',type=int,default=-1,
+                        help='which run in the log: 0 for the first, -1 (default) for the last')
+    worker = commands.add_parser('worker',help='run tests for a TestRunner(listen=...) on another machine')
+    worker.add_argument('address',help='host:port the runner is listening on')
+    worker.add_argument('--path',action='append',default=[],
+                        help='directory to import tests from. Can be given more than once')
+    merge = commands.add_parser('merge',help='report the JSON, jsstream or json-incremental output of several runs as one')
+    merge.add_argument('files',nargs='+')
+    merge.add_argument('-f','--format',action='append',
+                       help='output format, or format=file to write it to a file. Can be given more than once')
+    watch = commands.add_parser('watch',help='run the tests, then rerun the ones affected whenever python files change')
+    watch.add_argument('start',nargs='?',default='.',
+                       help='directory to find test files in (default: %(default)s)')
+    watch.add_argument('-p','--pattern',default='test*.py',
+                       help='test file names to look for (default: %(default)s)')
+    watch.add_argument('-t','--top-level-directory',
+                       help='directory test modules are imported from (default: start)')
+    watch.add_argument('--path',action='append',
+                       help='directory to watch (default: the top level directory). Can be given more than once')
+    watch.add_argument('--interval',type=float,default=0.5,
+                       help='seconds between looks at the files, where inotify can\'t be used (default: %(default)s)')
+    watch.add_argument('-f','--format',action='append',
+                       help='output format, or format=file to write it to a file. Can be given more than once')
+    args = parser.parse_args(argv)
+    if args.command not in ('replay','merge','worker','watch'):
+        parser.error('nothing to do')
+    if args.command == 'worker':
+        sys.path[:0] = args.path
+        work(args.address)
+        return 0
+
+    runner = TestRunner(format=[tuple(f.split('=',1)) if '=' in f else f for f in args.format or ['dots']])
+    if args.command == 'merge':
+        result = runner.merge(args.files)
+    elif args.command == 'watch':
+        result = runner.watch(args.start,args.pattern,args.top_level_directory,args.path,args.interval)
+        if result is None:
+            return 1
+    else:
+        result = runner.replay(args.log,args.run)
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())